@@ -0,0 +1,67 @@
+"""Time the per-row and NumPy paths of scan_jobs.
+
+Builds a synthetic jobs file and times scan_jobs with each engine for a
+range of tracked house counts, to show where the NumPy engine pays off.
+
+Run from the repository root, with Home Assistant and NumPy installed:
+
+    python benchmarks/scan_jobs.py --rows 1500000 --houses 1 1000 20000
+"""
+
+import argparse
+import csv
+from datetime import datetime, timedelta
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from custom_components.leeds_bins import leeds_bins_data_  # noqa: E402
+from custom_components.leeds_bins.columnar import COLOURS  # noqa: E402
+from custom_components.leeds_bins.leeds_bins_data_ import scan_jobs  # noqa: E402
+
+
+def make_text(rows, premises):
+    """Return a jobs file with rows spread over premises."""
+    rng = random.Random(0)
+    start = datetime.now()
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for _ in range(rows):
+        day = start + timedelta(days=rng.randrange(-30, 180))
+        writer.writerow(
+            [str(100000 + rng.randrange(premises)), rng.choice(COLOURS), f"{day:%d/%m/%y}"]
+        )
+    return buffer.getvalue()
+
+
+def time_scan(text, house_ids, numpy):
+    """Return seconds taken to scan text for house_ids with one engine."""
+    leeds_bins_data_.COLUMNAR_MIN_HOUSES = 0 if numpy else float("inf")
+    start = time.perf_counter()
+    scan_jobs(csv.reader(io.StringIO(text)), house_ids)
+    return time.perf_counter() - start
+
+
+def main():
+    """Print timings per house count for both engines."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--premises", type=int, default=50000)
+    parser.add_argument("--houses", type=int, nargs="+", default=[1, 1000, 5000, 20000])
+    args = parser.parse_args()
+
+    text = make_text(args.rows, args.premises)
+    print(f"{args.rows} rows over {args.premises} premises")
+    for count in args.houses:
+        house_ids = {str(100000 + house) for house in range(count)}
+        python = time_scan(text, house_ids, numpy=False)
+        numpy = time_scan(text, house_ids, numpy=True)
+        print(f"{count:>7} houses: python {python:6.2f} s  numpy {numpy:6.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Compare memory used by per-house schedule representations.
+
+Builds a synthetic jobs file and measures, with tracemalloc, the memory
+held for many tracked houses by:
+
+    dicts   the row lists and next dates dict kept for each house
+    store   one ScheduleStore with a HouseSchedule view per house
+
+Run from the repository root, with Home Assistant installed:
+
+    python benchmarks/schedule_memory.py --houses 5000
+"""
+
+import argparse
+import csv
+from datetime import datetime, timedelta
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from custom_components.leeds_bins.columnar import COLOURS  # noqa: E402
+from custom_components.leeds_bins.leeds_bins_data_ import (  # noqa: E402
+    find_next_dates_grouped,
+)
+from custom_components.leeds_bins.schedule_store import (  # noqa: E402
+    HouseSchedule,
+    ScheduleStore,
+)
+
+
+def make_lines(houses, weeks):
+    """Return jobs file lines, a fortnightly collection per colour."""
+    start = datetime.now()
+    lines = []
+    for house in range(houses):
+        for offset, colour in enumerate(COLOURS):
+            for week in range(weeks):
+                day = start + timedelta(days=week * 14 + (house + offset) % 14)
+                lines.append(f"{100000 + house},{colour},{day:%d/%m/%y}\r\n")
+    return lines
+
+
+def build_dicts(lines, now):
+    """Group rows per house and work out next dates, as before the store."""
+    rows_by_house = {}
+    for row in csv.reader(lines):
+        rows_by_house.setdefault(row[0], []).append(row)
+    next_dates = find_next_dates_grouped(rows_by_house, now)
+    return rows_by_house, next_dates
+
+
+def build_store(lines, now):
+    """Load rows into one store and make a coordinator view per house."""
+    store = ScheduleStore.from_rows(csv.reader(lines))
+    views = [
+        HouseSchedule(store, house_id, "Mon, 01 Jan 2024 00:00:00 GMT", now)
+        for house_id in store._spans
+    ]
+    return store, views
+
+
+def measure(build, lines, now):
+    """Return bytes still allocated by the result of build."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build(lines, now)
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del result
+    return used
+
+
+def main():
+    """Print memory per house for each representation."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--houses", type=int, default=1000)
+    parser.add_argument("--weeks", type=int, default=26)
+    args = parser.parse_args()
+
+    lines = make_lines(args.houses, args.weeks)
+    now = datetime.now()
+    print(f"{args.houses} houses, {len(lines)} rows")
+    for name, build in (("dicts", build_dicts), ("store", build_store)):
+        used = measure(build, lines, now)
+        print(f"{name:>6}: {used / 1e6:8.2f} MB  {used / args.houses:8.0f} B/house")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,36 +6,99 @@ import logging
 import os
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP, Platform
+from homeassistant.core import Event, HomeAssistant, callback
+import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.typing import ConfigType
 
-from .const import DOMAIN, CONF_HOUSE_ID
+from .const import DOMAIN, CONF_HOUSE_ID, entry_config
+from .executor import shutdown_executor
+from .schedule_store import get_schedule_store
+from .shared_cache import instance_name, unregister_house
+from .schedule_api import async_setup_schedule_api
 
 _LOGGER = logging.getLogger(__name__)
 PLATFORMS = [Platform.SENSOR]
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the Leeds Bins schedule API."""
+    async_setup_schedule_api(hass)
+
+    @callback
+    def async_stop(event: Event) -> None:
+        """Cancel dataset work so the worker pool does not delay shutdown."""
+        for coordinator in hass.data.get(DOMAIN, {}).values():
+            coordinator.cancel()
+        shutdown_executor(hass)
+
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, async_stop)
+    return True
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Leeds Bins from a config entry."""
     hass.data.setdefault(DOMAIN, {})
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
     return True
 
 
+async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload a config entry after its options change."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
+    if not (unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS)):
+        return unload_ok
+    _LOGGER.info("Successfully removed sensor from the Leeds Bins integration")
+    coordinator = hass.data.get(DOMAIN, {}).pop(entry.entry_id, None)
+    house_id = entry_config(entry)[CONF_HOUSE_ID]
+    if coordinator is not None:
+        # options may already name a different house
+        house_id = coordinator.house_id
+        await coordinator.async_cancel()
+        if not any(
+            other.house_id == coordinator.house_id
+            for other in hass.data[DOMAIN].values()
+        ):
+            get_schedule_store(hass).remove(coordinator.house_id)
+            if coordinator.shared_cache:
+                await hass.async_add_executor_job(
+                    unregister_shared_house, coordinator
+                )
+    if not hass.data.get(DOMAIN):
+        shutdown_executor(hass)
     cache_file = os.path.join(
         hass.config.config_dir,
         'custom_components',
         DOMAIN,
         'cache',
-        f'{entry.data[CONF_HOUSE_ID]}.json')
+        f'{house_id}.json')
+    await hass.async_add_executor_job(remove_cache_file, cache_file)
+    return unload_ok
+
+
+def remove_cache_file(cache_file):
+    """Remove a cache file in an executor."""
     if os.path.exists(cache_file):
         _LOGGER.info('Removing cache file')
         try:
             os.remove(cache_file)
         except Exception as e:
             _LOGGER.error('Could not remove file - %s', e)
-    if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
-        _LOGGER.info("Successfully removed sensor from the Leeds Bins integration")
-    return unload_ok
+
+
+def unregister_shared_house(coordinator):
+    """Stop refreshing a house in the shared cache, in an executor."""
+    try:
+        unregister_house(
+            coordinator.shared_cache,
+            coordinator.house_id,
+            instance_name(coordinator.folder),
+        )
+    except OSError as e:
+        _LOGGER.error('Could not unregister from shared cache - %s', e)
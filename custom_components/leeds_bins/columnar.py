@@ -0,0 +1,102 @@
+"""Columnar schedule engine for the Leeds Bins jobs dataset.
+
+Used by leeds_bins_data_.scan_jobs to filter the whole jobs file for many
+houses at once, such as a shared cache refresh, when NumPy is available.
+Smaller scans use the per-row Python path, which is faster for them. Both
+return the same rows and date strings.
+"""
+
+from datetime import datetime, timedelta
+import logging
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+_LOGGER = logging.getLogger(__name__)
+
+HAS_NUMPY = np is not None
+COLOURS = ("BROWN", "BLACK", "GREEN")
+DATE_FORMAT = "%d/%m/%y"
+# rows buffered before filtering into typed columns
+CHUNK_ROWS = 100000
+US_PER_DAY = 86400 * 1000000
+# tracked houses below which set lookups per row beat the columnar engine,
+# see benchmarks/scan_jobs.py
+COLUMNAR_MIN_HOUSES = 8000
+
+
+def _filter_chunk(ids, colours, dates, wanted):
+    """Keep the rows of one chunk that belong to a wanted house and colour."""
+    ids = np.array(ids, dtype=str)
+    colours = np.array(colours, dtype=str)
+    mask = np.isin(ids, wanted) & np.isin(colours, COLOURS)
+    return ids[mask], colours[mask], np.array(dates, dtype=str)[mask]
+
+
+def load_columns(rows, house_ids):
+    """Load premises id, colour and date columns for rows of house_ids.
+
+    rows can be a streaming reader over the whole jobs file, only CHUNK_ROWS
+    rows are held as Python lists at a time.
+    """
+    wanted = np.array(sorted(house_ids), dtype=str)
+    chunks = []
+    ids, colours, dates = [], [], []
+    for row in rows:
+        if len(row) < 3:
+            continue
+        ids.append(row[0])
+        colours.append(row[1])
+        dates.append(row[2])
+        if len(ids) >= CHUNK_ROWS:
+            chunks.append(_filter_chunk(ids, colours, dates, wanted))
+            ids, colours, dates = [], [], []
+    chunks.append(_filter_chunk(ids, colours, dates, wanted))
+    return tuple(np.concatenate(column) for column in zip(*chunks))
+
+
+def next_dates_columnar(ids, colours, dates, house_ids, now=None):
+    """Find the next date per colour for each house from loaded columns."""
+    if now is None:
+        now = datetime.now()
+    result = {house_id: dict.fromkeys(COLOURS) for house_id in house_ids}
+    if not len(ids):
+        return result
+
+    # parse each distinct date string once
+    unique_dates, date_index = np.unique(dates, return_inverse=True)
+    ordinals = np.array(
+        [datetime.strptime(date, DATE_FORMAT).toordinal() for date in unique_dates],
+        dtype=np.int64,
+    )[date_index]
+
+    # same ranking as find_nearest_date: distance from now, past days dropped
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    now_us = (now - today) // timedelta(microseconds=1)
+    day_offset = ordinals - today.toordinal()
+    distance = np.abs(day_offset * US_PER_DAY - now_us)
+    upcoming = np.flatnonzero(day_offset >= 0)
+    if not len(upcoming):
+        return result
+
+    _, house_codes = np.unique(ids, return_inverse=True)
+    _, colour_codes = np.unique(colours, return_inverse=True)
+    # file order breaks ties, like the strict < in find_nearest_date
+    order = upcoming[
+        np.lexsort(
+            (
+                upcoming,
+                distance[upcoming],
+                colour_codes[upcoming],
+                house_codes[upcoming],
+            )
+        )
+    ]
+    key = house_codes[order] * len(COLOURS) + colour_codes[order]
+    first = order[np.concatenate(([True], key[1:] != key[:-1]))]
+    for index in first:
+        result[str(ids[index])][str(colours[index])] = str(dates[index])
+    _LOGGER.debug("Columnar engine matched %s rows", len(ids))
+    return result
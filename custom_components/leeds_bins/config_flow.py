@@ -9,7 +9,7 @@ import voluptuous as vol
 from homeassistant import config_entries
 from homeassistant.core import callback
 
-from .const import CONF_NAME, DOMAIN, check_data, create_form
+from .const import CONF_NAME, DOMAIN, check_data, create_form, entry_config
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -60,7 +60,7 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
         """Set initial parameter to grab them later on."""
         # store old entry for later
         self.data = {}
-        self.data.update(config_entry.data.items())
+        self.data.update(entry_config(config_entry))
 
     # will be called by sending the form, until configuration is done
     async def async_step_init(self, user_input=None):  # pylint: disable=unused-argument
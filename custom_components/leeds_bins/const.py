@@ -1,7 +1,10 @@
 """Constants for the Leeds Bins integration."""
 
+import asyncio
 from collections import OrderedDict
+from functools import partial
 import logging
+import os
 
 import voluptuous as vol
 
@@ -9,7 +12,14 @@ from homeassistant.components.date import ENTITY_ID_FORMAT, PLATFORM_SCHEMA
 import homeassistant.helpers.config_validation as cv
 from homeassistant.helpers.entity import async_generate_entity_id
 
-from .leeds_bins_data_ import find_house_id
+from .executor import run_dataset_job
+from .leeds_bins_data_ import (
+    PREMISES_CSV,
+    DatasetCancelEvent,
+    dataset_location,
+    find_house_id,
+    is_remote,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -24,16 +34,22 @@ CONF_NAME = "name"
 CONF_HOUSE = "house"
 CONF_POSTCODE = "postcode"
 CONF_HOUSE_ID = "house_id"
+CONF_SOURCE = "source"
+CONF_SHARED_CACHE = "shared_cache"
 
 # defaults
 DEFAULT_NAME = ""
 DEFAULT_HOUSE = ""
 DEFAULT_POSTCODE = ""
 DEFAULT_HOUSE_ID = None
+DEFAULT_SOURCE = ""
+DEFAULT_SHARED_CACHE = ""
 
 # errors
 ERROR_POSTCODE = "invalid_postcode"
 ERROR_HOUSE_ID = "house_not_found"
+ERROR_SOURCE = "source_not_found"
+ERROR_SHARED_CACHE = "shared_cache_unavailable"
 
 # states
 STATE_ATTR_COLOUR = "colour"
@@ -74,10 +90,17 @@ PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend(
         vol.Required(CONF_HOUSE, default=DEFAULT_HOUSE): cv.string,
         vol.Required(CONF_POSTCODE, default=DEFAULT_POSTCODE): cv.string,
         vol.Optional(CONF_HOUSE_ID, default=DEFAULT_HOUSE_ID): cv.string,
+        vol.Optional(CONF_SOURCE, default=DEFAULT_SOURCE): cv.string,
+        vol.Optional(CONF_SHARED_CACHE, default=DEFAULT_SHARED_CACHE): cv.string,
     }
 )
 
 
+def entry_config(entry):
+    """Return the settings of a config entry, options overriding setup data."""
+    return {**entry.data, **entry.options}
+
+
 def ensure_config(user_input, hass):
     """Make sure that needed Parameter exist and are filled with default if not."""
     out = {}
@@ -85,6 +108,8 @@ def ensure_config(user_input, hass):
     out[CONF_HOUSE] = ""
     out[CONF_POSTCODE] = ""
     out[CONF_HOUSE_ID] = None
+    out[CONF_SOURCE] = DEFAULT_SOURCE
+    out[CONF_SHARED_CACHE] = DEFAULT_SHARED_CACHE
 
     if user_input is not None:
         if CONF_NAME in user_input:
@@ -97,6 +122,10 @@ def ensure_config(user_input, hass):
             out[CONF_HOUSE_ID] = user_input[CONF_HOUSE_ID]
         elif CONF_HOUSE_ID not in user_input:
             out[CONF_HOUSE_ID] = ""
+        if CONF_SOURCE in user_input:
+            out[CONF_SOURCE] = user_input[CONF_SOURCE].strip()
+        if CONF_SHARED_CACHE in user_input:
+            out[CONF_SHARED_CACHE] = user_input[CONF_SHARED_CACHE].strip()
     return out
 
 
@@ -108,6 +137,10 @@ def create_form(user_input, hass):
     data_schema[vol.Optional(CONF_NAME, default=user_input[CONF_NAME])] = str
     data_schema[vol.Required(CONF_HOUSE, default=user_input[CONF_HOUSE])] = str
     data_schema[vol.Required(CONF_POSTCODE, default=user_input[CONF_POSTCODE])] = str
+    data_schema[vol.Optional(CONF_SOURCE, default=user_input[CONF_SOURCE])] = str
+    data_schema[
+        vol.Optional(CONF_SHARED_CACHE, default=user_input[CONF_SHARED_CACHE])
+    ] = str
     return data_schema
 
 
@@ -151,6 +184,25 @@ async def check_data(user_input, hass, own_id=None):
                 return_["errors"] = errors
                 return return_
     _LOGGER.debug(user_input[CONF_POSTCODE])
+    if user_input[CONF_SOURCE] and not is_remote(user_input[CONF_SOURCE]):
+        premises_file = await hass.async_add_executor_job(
+            dataset_location, user_input[CONF_SOURCE], PREMISES_CSV
+        )
+        if not await hass.async_add_executor_job(os.path.isfile, premises_file):
+            _LOGGER.error("%s Dataset file not found - %s", LOG_PREFIX, premises_file)
+            errors[CONF_SOURCE] = ERROR_SOURCE
+            return_["errors"] = errors
+            return return_
+    if user_input[CONF_SHARED_CACHE]:
+        try:
+            await hass.async_add_executor_job(
+                partial(os.makedirs, user_input[CONF_SHARED_CACHE], exist_ok=True)
+            )
+        except OSError as e:
+            _LOGGER.error("%s Shared cache folder not usable - %s", LOG_PREFIX, e)
+            errors[CONF_SHARED_CACHE] = ERROR_SHARED_CACHE
+            return_["errors"] = errors
+            return return_
     if user_input[CONF_HOUSE_ID] == "":
         user_input[CONF_HOUSE_ID] = await load_house_id(hass, user_input)
         if user_input[CONF_HOUSE_ID] is None:
@@ -166,6 +218,17 @@ async def check_data(user_input, hass, own_id=None):
 
 async def load_house_id(hass, user_input):
     """Load the house id."""
-    return await hass.async_add_executor_job(
-        find_house_id, user_input[CONF_POSTCODE], user_input[CONF_HOUSE]
+    cancel_event = DatasetCancelEvent()
+    job = run_dataset_job(
+        hass,
+        cancel_event,
+        find_house_id,
+        user_input[CONF_POSTCODE],
+        user_input[CONF_HOUSE],
+        user_input[CONF_SOURCE],
     )
+    try:
+        return await asyncio.wrap_future(job)
+    except asyncio.CancelledError:
+        cancel_event.set()
+        raise
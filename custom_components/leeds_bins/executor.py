@@ -0,0 +1,43 @@
+"""Dedicated worker pool for Leeds Bins dataset work."""
+
+from __future__ import annotations
+
+from concurrent.futures import Future, ThreadPoolExecutor
+import logging
+
+from homeassistant.core import HomeAssistant
+
+from .leeds_bins_data_ import DatasetCancelEvent
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_EXECUTOR = "leeds_bins_executor"
+MAX_WORKERS = 2
+CANCEL_TIMEOUT = 1
+
+
+def get_executor(hass: HomeAssistant) -> ThreadPoolExecutor:
+    """Return the integration worker pool, creating it if needed."""
+    executor = hass.data.get(DATA_EXECUTOR)
+    if executor is None:
+        _LOGGER.debug("Starting dataset worker pool with %s workers", MAX_WORKERS)
+        executor = ThreadPoolExecutor(
+            max_workers=MAX_WORKERS, thread_name_prefix="leeds_bins"
+        )
+        hass.data[DATA_EXECUTOR] = executor
+    return executor
+
+
+def run_dataset_job(
+    hass: HomeAssistant, cancel_event: DatasetCancelEvent, target, *args
+) -> Future:
+    """Submit a dataset job that checks cancel_event at its checkpoints."""
+    return get_executor(hass).submit(target, *args, cancel_event=cancel_event)
+
+
+def shutdown_executor(hass: HomeAssistant) -> None:
+    """Stop the worker pool, dropping queued jobs."""
+    executor = hass.data.pop(DATA_EXECUTOR, None)
+    if executor is not None:
+        _LOGGER.debug("Stopping dataset worker pool")
+        executor.shutdown(wait=False, cancel_futures=True)
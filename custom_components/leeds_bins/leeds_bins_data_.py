@@ -1,60 +1,211 @@
 """Leeds bins module."""
 
 import csv, os
+from contextlib import contextmanager, nullcontext
 from datetime import datetime, timezone
-from io import StringIO
+from email.utils import formatdate
+import gzip
+from io import TextIOWrapper
 import logging
+import socket
+import threading
 
 import requests
 
+from .columnar import (
+    COLOURS,
+    COLUMNAR_MIN_HOUSES,
+    HAS_NUMPY,
+    load_columns,
+    next_dates_columnar,
+)
+
 _LOGGER = logging.getLogger(__name__)
 
+COUNCIL_SOURCE = "https://opendata.leeds.gov.uk/downloads/bins"
+PREMISES_CSV = "dm_premises.csv"
+JOBS_CSV = "dm_jobs.csv"
+# rows parsed between cancellation checks
+CANCEL_CHECK_ROWS = 1000
+# (connect, read) seconds, a stalled body read is also ended on cancel
+DOWNLOAD_TIMEOUT = (10, 5)
 
-def find_house_id(postcode, house):
-    """Find house ID."""
-    csv_url = "https://opendata.leeds.gov.uk/downloads/bins/dm_premises.csv"
 
+class DatasetCancelled(Exception):
+    """Dataset work was cancelled before it finished."""
+
+
+class DatasetCancelEvent(threading.Event):
+    """Cancel event that can also interrupt blocking reads.
+
+    Hooks registered with on_cancel run when the event is set, so a read
+    stalled on the network can be ended without waiting for its timeout.
+    """
+
+    def __init__(self):
+        """Start unset with no hooks."""
+        super().__init__()
+        self._hooks = set()
+        self._hooks_lock = threading.Lock()
+
+    def set(self):
+        """Set the event and run the registered hooks."""
+        super().set()
+        with self._hooks_lock:
+            hooks = list(self._hooks)
+        for hook in hooks:
+            hook()
+
+    @contextmanager
+    def on_cancel(self, hook):
+        """Run hook if the event is set while the context is active."""
+        with self._hooks_lock:
+            self._hooks.add(hook)
+        try:
+            if self.is_set():
+                hook()
+            yield
+        finally:
+            with self._hooks_lock:
+                self._hooks.discard(hook)
+
+
+def on_cancel(cancel_event, hook):
+    """Return a context that runs hook on cancel, if cancel_event supports it."""
+    if isinstance(cancel_event, DatasetCancelEvent):
+        return cancel_event.on_cancel(hook)
+    return nullcontext()
+
+
+def interrupt_response(response):
+    """End a blocked read of a streaming response from another thread."""
     try:
-        response = requests.get(csv_url, timeout=200)
+        # http.client keeps the socket on its buffered reader once the
+        # headers are read, shutting it down wakes the reading thread
+        response.raw._fp.fp.raw._sock.shutdown(socket.SHUT_RDWR)
+    except (AttributeError, OSError) as e:
+        _LOGGER.debug("Could not interrupt download - %s", e)
+
+
+def check_cancelled(cancel_event):
+    """Raise DatasetCancelled if cancel_event has been set."""
+    if cancel_event is not None and cancel_event.is_set():
+        raise DatasetCancelled
+
+
+def is_remote(source):
+    """Return True if source is a URL rather than a local folder."""
+    return source.startswith(("http://", "https://"))
+
+
+def dataset_location(source, filename):
+    """Return the URL or path of a dataset file within source."""
+    if not source:
+        source = COUNCIL_SOURCE
+    if is_remote(source):
+        return f"{source.rstrip('/')}/{filename}"
+    path = os.path.join(source, filename)
+    if not os.path.exists(path) and os.path.exists(f"{path}.gz"):
+        return f"{path}.gz"
+    return path
+
+
+def open_csv(path, mode="r"):
+    """Open a local CSV file as text, gzip compressed if it ends in .gz."""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode=f"{mode}t", newline="", encoding="utf-8")
+    return open(path, mode=mode, newline="", encoding="utf-8")
+
+
+def file_last_modified(path):
+    """Return the modification time of a local file as an HTTP date."""
+    return formatdate(os.stat(path).st_mtime, usegmt=True)
+
+
+def dataset_headers(location):
+    """Return status code and headers for a dataset without fetching it."""
+    if not is_remote(location):
+        return 200, {
+            "Last-Modified": file_last_modified(location),
+            "Content-Length": str(os.stat(location).st_size),
+        }
+    response = requests.head(location, timeout=DOWNLOAD_TIMEOUT)
+    return response.status_code, response.headers
+
+
+@contextmanager
+def open_dataset(location, cancel_event=None):
+    """Open a dataset URL or local file as a text stream.
+
+    Yields (text stream, Last-Modified), raises OSError if the server does
+    not return the file. Setting cancel_event ends a stalled download.
+    """
+    if not is_remote(location):
+        with open_csv(location) as text:
+            yield text, file_last_modified(location)
+        return
+    with requests.get(location, timeout=DOWNLOAD_TIMEOUT, stream=True) as response:
         if response.status_code != 200:
-            _LOGGER.debug("Failed to fetch CSV from the web")
-            return None
-        csv_data = response.content
-        postcode = postcode.upper()
-        csv_io = StringIO(csv_data.decode("utf-8"))
-        csv_reader = csv.reader(csv_io)
-        for row in csv_reader:
+            raise OSError(f"HTTP {response.status_code} fetching {location}")
+        response.raw.decode_content = True
+        # keep the stream open at EOF so TextIOWrapper can finish reading
+        response.raw.auto_close = False
+        with on_cancel(cancel_event, lambda: interrupt_response(response)):
+            with TextIOWrapper(response.raw, encoding="utf-8", newline="") as text:
+                yield text, response.headers.get("Last-Modified")
+
+
+def iter_csv_rows(text, cancel_event=None):
+    """Parse CSV rows from a text stream, checking for cancellation."""
+    for count, row in enumerate(csv.reader(text)):
+        if count % CANCEL_CHECK_ROWS == 0:
+            check_cancelled(cancel_event)
+        yield row
+
+
+def find_house_id(postcode, house, source=None, cancel_event=None):
+    """Find house ID."""
+    location = dataset_location(source, PREMISES_CSV)
+
+    try:
+        with open_dataset(location, cancel_event) as (text, _):
+            postcode = postcode.upper()
             if house.isdigit():
                 column = 2
             else:
                 column = 1
                 house = house.upper()
-
-            if row[column] == house and row[6] == postcode:
-                csv_io.close()
-                return row[0]
-        csv_io.close()
+            for row in iter_csv_rows(text, cancel_event):
+                if row[column] == house and row[6] == postcode:
+                    return row[0]
         return None  # noqa: TRY300
+    except DatasetCancelled:
+        _LOGGER.debug("House lookup cancelled")
+        return None
     except Exception as e:
         _LOGGER.error("Error occurred: %s", e)
         return None
 
 
-def find_bin_days(house_id, updated_at, old_data, cache_csv_file):
-    """Find next bin days."""
-    csv_url = "https://opendata.leeds.gov.uk/downloads/bins/dm_jobs.csv"
+def find_bin_days(
+    house_id, updated_at, old_data, cache_csv_file, source=None, cancel_event=None
+):
+    """Find next bin days.
+
+    Raises DatasetCancelled if cancel_event is set before the cache is written.
+    """
+    location = dataset_location(source, JOBS_CSV)
     try:
-        response = requests.head(
-            csv_url, timeout=200
-        )  # Use HEAD request to fetch only headers
+        # Only fetch headers to check if the file has changed
+        status_code, headers = dataset_headers(location)
     except Exception as e:
         _LOGGER.error("Failed to fetch data from web - %s", e)
         return get_next_dates_from_cache(cache_csv_file, old_data, house_id)
-    if response.status_code != 200:
+    if status_code != 200:
         _LOGGER.debug("Failed to fetch CSV from the web")
         return get_next_dates_from_cache(cache_csv_file, old_data, house_id)
     
-    last_modified_str = response.headers.get("Last-Modified")
+    last_modified_str = headers.get("Last-Modified")
     if not last_modified_str:
         _LOGGER.debug("Last-Modified header not found")
         return get_next_dates_from_cache(cache_csv_file, old_data, house_id)
@@ -71,59 +222,94 @@ def find_bin_days(house_id, updated_at, old_data, cache_csv_file):
             _LOGGER.debug("CSV file not updated since last check")
             return old_data
     
-    if int(response.headers.get("Content-Length", 0)) == 0:
+    if int(headers.get("Content-Length", 0)) == 0:
         _LOGGER.debug("CSV file is 0 bytes")
         return get_next_dates_from_cache(cache_csv_file, old_data, house_id)
 
     _LOGGER.info("Refreshing waste collection data - %s", house_id)
+    next_dates = {"BROWN": None, "BLACK": None, "GREEN": None}
     try:
-        response = requests.get(csv_url, timeout=200)
+        with open_dataset(location, cancel_event) as (text, last_modified_str):
+            rows_by_house, dates_by_house = scan_jobs(
+                iter_csv_rows(text, cancel_event), {house_id}
+            )
+        matching_rows = rows_by_house[house_id]
+    except DatasetCancelled:
+        raise
     except Exception as e:
+        # an interrupted download fails rather than reporting the cancel
+        check_cancelled(cancel_event)
         _LOGGER.error("Failed to fetch data from web - %s", e)
         return get_next_dates_from_cache(cache_csv_file, old_data, house_id)
-    if response.status_code != 200:
-        _LOGGER.debug("Failed to fetch CSV from the web")
-        return get_next_dates_from_cache(cache_csv_file, old_data, house_id)
-    csv_data = response.content
-    next_dates = {"BROWN": None, "BLACK": None, "GREEN": None}
-    matching_rows = []
-    count = 0
-    csv_io = StringIO(csv_data.decode("utf-8"))
-    csv_reader = csv.reader(csv_io)
-    for row in csv_reader:
-        if row[0] == house_id:
-            matching_rows.append(row)
-        else:
-            count += 1
+    check_cancelled(cancel_event)
     # Write matching rows to the cache CSV file
     try:
         if os.path.exists(cache_csv_file):
             os.remove(cache_csv_file)
             _LOGGER.info("Deleted existing cache file: %s", cache_csv_file)
-        with open(cache_csv_file, mode='w', newline='', encoding='utf-8') as file:
+        with open_csv(cache_csv_file, mode='w') as file:
             writer = csv.writer(file)
             writer.writerows(matching_rows)
             _LOGGER.info("Matching rows written to cache file: %s", cache_csv_file)
     except Exception as e:
         _LOGGER.error("Failed to write to cache file - %s", e)
         return old_data
-    for color in ["BROWN", "BLACK", "GREEN"]:
-        nearest_date = find_nearest_date(matching_rows, color)
-        if nearest_date:
-            next_dates[color] = nearest_date
-    next_dates["updated_at"] = response.headers.get("Last-Modified")
+    next_dates.update(dates_by_house[house_id])
+    next_dates["updated_at"] = last_modified_str
     _LOGGER.info("Next Collection Dates: %s", next_dates)
-    csv_io.close()
     return next_dates
 
 
-def find_nearest_date(rows, color):
+def scan_jobs(rows, house_ids, now=None):
+    """Split jobs rows for house_ids and find their next dates.
+
+    rows is normally a streaming reader over the whole jobs file. Returns
+    ({house_id: [[house_id, colour, date], ...]}, {house_id: next dates}).
+    The NumPy engine is used when available and at least COLUMNAR_MIN_HOUSES
+    houses are scanned, both paths return the same result.
+    """
+    if now is None:
+        now = datetime.now()
+    if not HAS_NUMPY or len(house_ids) < COLUMNAR_MIN_HOUSES:
+        rows_by_house = {house_id: [] for house_id in house_ids}
+        for row in rows:
+            if len(row) >= 3 and row[0] in rows_by_house and row[1] in COLOURS:
+                rows_by_house[row[0]].append(row[:3])
+        return rows_by_house, find_next_dates_grouped(rows_by_house, now)
+
+    ids, colours, dates = load_columns(rows, house_ids)
+    rows_by_house = {house_id: [] for house_id in house_ids}
+    for row in zip(ids.tolist(), colours.tolist(), dates.tolist()):
+        rows_by_house[row[0]].append(list(row))
+    return rows_by_house, next_dates_columnar(ids, colours, dates, house_ids, now)
+
+
+def find_next_dates(rows, house_ids, now=None):
+    """Find the next date per colour for each house in already filtered rows."""
+    if now is None:
+        now = datetime.now()
+    grouped = {house_id: [] for house_id in house_ids}
+    for row in rows:
+        if len(row) >= 3 and row[0] in grouped:
+            grouped[row[0]].append(row)
+    return find_next_dates_grouped(grouped, now)
+
+
+def find_next_dates_grouped(rows_by_house, now):
+    """Find the next date per colour for rows grouped by house."""
+    return {
+        house_id: {color: find_nearest_date(house_rows, color, now) for color in COLOURS}
+        for house_id, house_rows in rows_by_house.items()
+    }
+
+
+def find_nearest_date(rows, color, now=None):
     """Find nearest bin dates."""
     matching_rows = [row for row in rows if row[1] == color]
     if not matching_rows:
         return None
 
-    current_date = datetime.now()
+    current_date = now if now is not None else datetime.now()
     nearest_date = None
 
     for row in matching_rows:
@@ -145,15 +331,12 @@ def get_next_dates_from_cache(cache_csv, old_data, house_id):
     csv_reader = csv.reader(cache_csv)
     next_dates = {"BROWN": None, "BLACK": None, "GREEN": None}
     matching_rows = []
-    with open(cache_csv, mode='r', newline='', encoding='utf-8') as file:
+    with open_csv(cache_csv) as file:
         csv_reader = csv.reader(file)
         for row in csv_reader:
             if row[0] == house_id:
                 matching_rows.append(row)
-    for color in ["BROWN", "BLACK", "GREEN"]:
-        nearest_date = find_nearest_date(matching_rows, color)
-        if nearest_date:
-            next_dates[color] = nearest_date
+    next_dates.update(find_next_dates(matching_rows, {house_id})[house_id])
     next_dates["updated_at"] = datetime.now(timezone.utc).strftime("%a, %d %b %Y %H:%M:%S %Z")
     _LOGGER.info("Next Collection Dates from cache: %s", next_dates)
     return next_dates
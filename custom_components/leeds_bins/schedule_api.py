@@ -0,0 +1,140 @@
+"""Bulk schedule queries for the Leeds Bins integration."""
+
+from __future__ import annotations
+
+from datetime import datetime
+import logging
+
+import voluptuous as vol
+
+from homeassistant.components import websocket_api
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+import homeassistant.helpers.config_validation as cv
+import homeassistant.util.dt as dt_util
+
+from .columnar import COLOURS, DATE_FORMAT
+from .const import BIN_TYPES, DOMAIN
+from .schedule_store import get_schedule_store
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_GET_SCHEDULES = "get_schedules"
+WS_TYPE_SCHEDULES = f"{DOMAIN}/schedules"
+
+ATTR_HOUSE_IDS = "house_ids"
+ATTR_START_DATE = "start_date"
+ATTR_END_DATE = "end_date"
+ATTR_COLOURS = "colours"
+
+QUERY_SCHEMA = {
+    vol.Optional(ATTR_HOUSE_IDS): vol.All(cv.ensure_list, [cv.string]),
+    vol.Optional(ATTR_START_DATE): cv.date,
+    vol.Optional(ATTR_END_DATE): cv.date,
+    vol.Optional(ATTR_COLOURS): vol.All(
+        cv.ensure_list, [vol.All(cv.string, vol.Upper, vol.In(COLOURS))]
+    ),
+}
+
+
+def next_collections(data):
+    """Return (colour, date) pairs from coordinator data."""
+    collections = set()
+    for colour in COLOURS:
+        try:
+            collections.add(
+                (colour, datetime.strptime(data[colour], DATE_FORMAT).date())
+            )
+        except (KeyError, TypeError, ValueError):
+            continue
+    return collections
+
+
+async def async_query_schedules(
+    hass: HomeAssistant, house_ids=None, start_date=None, end_date=None, colours=None
+) -> dict:
+    """Return upcoming collections for tracked houses without fetching data."""
+    if start_date is None:
+        start_date = dt_util.now().date()
+    colours = set(colours or COLOURS)
+    coordinators = [
+        coordinator
+        for coordinator in hass.data.get(DOMAIN, {}).values()
+        if not house_ids or coordinator.house_id in house_ids
+    ]
+    store = get_schedule_store(hass)
+
+    houses = {}
+    for coordinator in coordinators:
+        collections = {
+            (entry.colour, entry.date) for entry in store.schedule(coordinator.house_id)
+        }
+        # next dates cover houses whose cache CSV could not be read
+        collections |= next_collections(coordinator.data or {})
+        houses[coordinator.house_id] = {
+            "name": coordinator.config_name,
+            "updated_at": (coordinator.data or {}).get("updated_at"),
+            "collections": [
+                {
+                    "colour": colour,
+                    "type": BIN_TYPES[colour],
+                    "date": date.isoformat(),
+                }
+                for colour, date in sorted(
+                    collections, key=lambda collection: (collection[1], collection[0])
+                )
+                if colour in colours
+                and date >= start_date
+                and (end_date is None or date <= end_date)
+            ],
+        }
+    return {"houses": houses}
+
+
+@websocket_api.websocket_command(
+    {vol.Required("type"): WS_TYPE_SCHEDULES, **QUERY_SCHEMA}
+)
+@websocket_api.async_response
+async def websocket_schedules(
+    hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: dict
+) -> None:
+    """Send upcoming collections for tracked houses."""
+    connection.send_result(
+        msg["id"],
+        await async_query_schedules(
+            hass,
+            msg.get(ATTR_HOUSE_IDS),
+            msg.get(ATTR_START_DATE),
+            msg.get(ATTR_END_DATE),
+            msg.get(ATTR_COLOURS),
+        ),
+    )
+
+
+@callback
+def async_setup_schedule_api(hass: HomeAssistant) -> None:
+    """Register the schedule websocket command and service."""
+
+    async def async_get_schedules(call: ServiceCall) -> ServiceResponse:
+        """Return upcoming collections for tracked houses."""
+        return await async_query_schedules(
+            hass,
+            call.data.get(ATTR_HOUSE_IDS),
+            call.data.get(ATTR_START_DATE),
+            call.data.get(ATTR_END_DATE),
+            call.data.get(ATTR_COLOURS),
+        )
+
+    websocket_api.async_register_command(hass, websocket_schedules)
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_SCHEDULES,
+        async_get_schedules,
+        schema=vol.Schema(QUERY_SCHEMA),
+        supports_response=SupportsResponse.ONLY,
+    )
@@ -0,0 +1,193 @@
+"""Compact schedule store shared by every tracked premises."""
+
+from array import array
+from collections.abc import Mapping
+from datetime import date, datetime
+import sys
+
+from homeassistant.core import HomeAssistant
+
+from .columnar import COLOURS, DATE_FORMAT
+
+DATA_SCHEDULE_STORE = "leeds_bins_schedule_store"
+
+
+def get_schedule_store(hass: HomeAssistant):
+    """Return the schedule store shared by all entries."""
+    store = hass.data.get(DATA_SCHEDULE_STORE)
+    if store is None:
+        store = hass.data[DATA_SCHEDULE_STORE] = ScheduleStore()
+    return store
+
+
+class ScheduleEntry:
+    """Read-only view of one collection in a ScheduleStore."""
+
+    __slots__ = ("_store", "_row", "house_id")
+
+    def __init__(self, store, row, house_id):
+        """Point the view at a row of the store."""
+        self._store = store
+        self._row = row
+        self.house_id = house_id
+
+    @property
+    def colour(self):
+        """Return the bin colour."""
+        return COLOURS[self._store.colours[self._row]]
+
+    @property
+    def date(self):
+        """Return the collection date."""
+        return date.fromordinal(self._store.dates[self._row])
+
+    def __repr__(self):
+        """Return a readable representation."""
+        return f"ScheduleEntry({self.house_id!r}, {self.colour!r}, {self.date})"
+
+
+class ScheduleStore:
+    """Collection dates for many premises in array-backed columns.
+
+    Each premises owns a span of rows kept in file order. Colours are
+    indexes into COLOURS and dates are day ordinals. Replacing a schedule
+    appends a new span, the old rows are reclaimed once more than half of
+    the columns are unused.
+    """
+
+    __slots__ = ("_spans", "colours", "dates")
+
+    def __init__(self):
+        """Start with no schedules."""
+        self._spans = {}
+        self.colours = array("B")
+        self.dates = array("I")
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build a store from jobs dataset rows for every premises in them."""
+        grouped = {}
+        for row in rows:
+            if len(row) >= 3:
+                grouped.setdefault(row[0], []).append(row)
+        store = cls()
+        for house_id, house_rows in grouped.items():
+            store.set_rows(house_id, house_rows)
+        return store
+
+    def __len__(self):
+        """Return the number of collections held."""
+        return sum(end - start for start, end in self._spans.values())
+
+    def __contains__(self, house_id):
+        """Return True if the store has a schedule for house_id."""
+        return house_id in self._spans
+
+    def set_rows(self, house_id, rows):
+        """Replace the schedule of house_id with jobs dataset rows."""
+        colour_codes = {colour: code for code, colour in enumerate(COLOURS)}
+        ordinals = {}
+        start = len(self.dates)
+        for row in rows:
+            if len(row) < 3 or row[1] not in colour_codes:
+                continue
+            ordinal = ordinals.get(row[2])
+            if ordinal is None:
+                ordinal = datetime.strptime(row[2], DATE_FORMAT).toordinal()
+                ordinals[row[2]] = ordinal
+            self.colours.append(colour_codes[row[1]])
+            self.dates.append(ordinal)
+        self._spans[sys.intern(house_id)] = (start, len(self.dates))
+        self._compact_if_sparse()
+
+    def remove(self, house_id):
+        """Drop the schedule of house_id."""
+        if self._spans.pop(house_id, None) is not None:
+            self._compact_if_sparse()
+
+    def _compact_if_sparse(self):
+        """Copy live spans to new columns if most rows are unused."""
+        if (len(self.dates) - len(self)) * 2 <= len(self.dates):
+            return
+        colours = array("B")
+        dates = array("I")
+        for house_id, (start, end) in self._spans.items():
+            self._spans[house_id] = (len(dates), len(dates) + end - start)
+            colours.extend(self.colours[start:end])
+            dates.extend(self.dates[start:end])
+        self.colours = colours
+        self.dates = dates
+
+    def _rows(self, house_id):
+        """Return the row range for house_id."""
+        return range(*self._spans.get(house_id, (0, 0)))
+
+    def schedule(self, house_id):
+        """Return the collections for house_id as entry views."""
+        return [ScheduleEntry(self, row, house_id) for row in self._rows(house_id)]
+
+    def next_dates(self, house_id, now=None):
+        """Return the next date per colour for house_id, as find_nearest_date."""
+        if now is None:
+            now = datetime.now()
+        today_ordinal = now.toordinal()
+        nearest = {}
+        for row in self._rows(house_id):
+            ordinal = self.dates[row]
+            if ordinal < today_ordinal:
+                continue
+            colour = self.colours[row]
+            distance = abs(now - datetime.fromordinal(ordinal))
+            if colour not in nearest or distance < nearest[colour][1]:
+                nearest[colour] = (ordinal, distance)
+        return {
+            colour: (
+                date.fromordinal(nearest[code][0]).strftime(DATE_FORMAT)
+                if code in nearest
+                else None
+            )
+            for code, colour in enumerate(COLOURS)
+        }
+
+
+class HouseSchedule(Mapping):
+    """Coordinator data for one premises, read from a ScheduleStore.
+
+    Behaves like the next dates dict returned by find_bin_days. Dates are
+    worked out once, as of the refresh that produced the view.
+    """
+
+    __slots__ = ("store", "house_id", "updated_at", "as_of", "_next_dates")
+
+    def __init__(self, store, house_id, updated_at, as_of=None):
+        """Point the view at the schedule of house_id."""
+        self.store = store
+        self.house_id = house_id
+        self.updated_at = updated_at
+        self.as_of = as_of if as_of is not None else datetime.now()
+        self._next_dates = None
+
+    def __getitem__(self, key):
+        """Return the next date for a colour, or updated_at."""
+        if key == "updated_at":
+            return self.updated_at
+        if key not in COLOURS:
+            raise KeyError(key)
+        if self.house_id not in self.store:
+            return "no_data"
+        if self._next_dates is None:
+            self._next_dates = self.store.next_dates(self.house_id, self.as_of)
+        return self._next_dates[key]
+
+    def __iter__(self):
+        """Iterate over the colours and updated_at."""
+        yield from COLOURS
+        yield "updated_at"
+
+    def __len__(self):
+        """Return the number of keys."""
+        return len(COLOURS) + 1
+
+    def __repr__(self):
+        """Return a readable representation."""
+        return f"HouseSchedule({dict(self)!r})"
@@ -1,12 +1,16 @@
 """Support for UK Bin Collection Dat sensors."""
 
+import asyncio
+import csv
 from datetime import timedelta
+import gzip
 import logging
 
 from dateutil import parser
 from datetime import datetime
 import os
 import json
+import shutil
 
 from homeassistant.components.sensor import ENTITY_ID_FORMAT, SensorEntity
 from homeassistant.config_entries import ConfigEntry
@@ -25,6 +29,9 @@ from .const import (
     DOMAIN,
     CONF_HOUSE_ID,
     CONF_NAME,
+    CONF_SHARED_CACHE,
+    CONF_SOURCE,
+    entry_config,
     STATE_ATTR_COLOUR,
     STATE_ATTR_DAYS,
     STATE_ATTR_NEXT_COLLECTION,
@@ -34,7 +41,15 @@ from .const import (
     BIN_ICONS,
     DEFAULT_DATA
 )
-from .leeds_bins_data_ import find_bin_days
+from .executor import CANCEL_TIMEOUT, run_dataset_job
+from .leeds_bins_data_ import (
+    DatasetCancelEvent,
+    DatasetCancelled,
+    find_bin_days,
+    open_csv,
+)
+from .schedule_store import HouseSchedule, get_schedule_store
+from .shared_cache import find_bin_days_shared
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -46,20 +61,20 @@ async def async_setup_entry(
 ) -> None:
     """Set up the sensor platform."""
     _LOGGER.debug("Setting up leeds bins data collection platform")
-    _LOGGER.debug("Config supplied: %s", config.data)
+    settings = entry_config(config)
+    _LOGGER.debug("Config supplied: %s", settings)
 
-    _LOGGER.info("Using house id: %s", config.data.get(CONF_HOUSE_ID))
+    _LOGGER.info("Using house id: %s", settings.get(CONF_HOUSE_ID))
 
     coordinator = HouseholdBinCoordinator(
-        hass, config.data.get(CONF_HOUSE_ID), config.data.get(CONF_NAME)
+        hass,
+        settings.get(CONF_HOUSE_ID),
+        settings.get(CONF_NAME),
+        settings.get(CONF_SOURCE),
+        settings.get(CONF_SHARED_CACHE),
     )
-    cache_file = os.path.join(
-        hass.config.config_dir,
-        'custom_components',
-        DOMAIN,
-        'cache',
-        f'{config.data.get(CONF_HOUSE_ID)}.json')
-    if not os.path.exists(cache_file):
+    hass.data[DOMAIN][config.entry_id] = coordinator
+    if not await coordinator.async_load_cache_file():
         _LOGGER.info('Starting initial data download')
         await coordinator.async_config_entry_first_refresh()
 
@@ -69,15 +84,29 @@ async def async_setup_entry(
     async_add_entities([LeedsBinsDataSensor(coordinator, "NEXTBIN")])
 
 
-def get_latest_collection_info(house_id, updated_at, data, cache_csv_file) -> dict:
+def get_latest_collection_info(
+    house_id,
+    updated_at,
+    data,
+    cache_csv_file,
+    source=None,
+    shared_cache=None,
+    cancel_event=None,
+) -> dict:
     """Get the next bin collection dates."""
-    return find_bin_days(house_id, updated_at, data, cache_csv_file)
+    if shared_cache:
+        return find_bin_days_shared(
+            house_id, updated_at, data, cache_csv_file, shared_cache, source, cancel_event
+        )
+    return find_bin_days(
+        house_id, updated_at, data, cache_csv_file, source, cancel_event
+    )
 
 
 class HouseholdBinCoordinator(DataUpdateCoordinator):
     """Househould Waste Data collection agent."""
 
-    def __init__(self, hass, house_id, name):
+    def __init__(self, hass, house_id, name, source=None, shared_cache=None):
         """Initiate data collection agent."""
         super().__init__(
             hass,
@@ -91,44 +120,110 @@ class HouseholdBinCoordinator(DataUpdateCoordinator):
             'custom_components',
             DOMAIN,
             'cache')
-        if not os.path.exists(folder):
-            os.makedirs(folder)
+        self.folder = folder
         self.house_id = house_id
         self.hass = hass
         self.config_name = name
+        self.source = source
+        self.shared_cache = shared_cache
         self.updated_at = None
         self.cache_file = os.path.join(folder, f'{self.house_id}.json')
-        self.cache_csv_file = os.path.join(folder, f'{self.house_id}.csv')
+        self.cache_csv_file = os.path.join(folder, f'{self.house_id}.csv.gz')
+        self._cancel_event = DatasetCancelEvent()
+        self._job = None
         _LOGGER.debug("Cache file path - %s", self.cache_file)
 
-        
-        self.hass.async_create_task(self._async_load_cache_file())
-
-        if not os.path.exists(self.cache_file):
+    async def async_load_cache_file(self):
+        """Load the cache files off the event loop, return True if found."""
+        data = await self.hass.async_add_executor_job(self._load_cache_file)
+        if data is None:
             self.data = DEFAULT_DATA
-        else:
-            self.hass.async_create_task(self._async_load_cache_file())
-    async def _async_load_cache_file(self):
-        """Asynchronously load the cache file."""
-        if os.path.exists(self.cache_file):
-            self.data = await self.hass.async_add_executor_job(self._load_cache_file)
-            _LOGGER.debug("Loaded data from cache file")
+            return False
+        rows = await self.hass.async_add_executor_job(self._read_cache_rows)
+        self.data = self._schedule_data(data, rows)
+        _LOGGER.debug("Loaded data from cache file")
+        return True
 
     def _load_cache_file(self):
-        """Load the cache file in an executor."""
-        with open(self.cache_file, 'r') as file:
-            return json.load(file)
+        """Create the cache folder and load the cache file in an executor."""
+        os.makedirs(self.folder, exist_ok=True)
+        legacy_csv_file = os.path.join(self.folder, f'{self.house_id}.csv')
+        if os.path.exists(legacy_csv_file):
+            self._migrate_cache_csv(legacy_csv_file)
+        if not os.path.exists(self.cache_file):
+            return None
+        try:
+            with open(self.cache_file, 'r') as file:
+                return json.load(file)
+        except (OSError, ValueError) as e:
+            _LOGGER.warning("Ignoring unreadable cache file - %s", e)
+            return None
+
+    def _migrate_cache_csv(self, legacy_csv_file):
+        """Compress a cache CSV file written by an older version."""
+        _LOGGER.debug("Compressing cache file - %s", legacy_csv_file)
+        if not os.path.exists(self.cache_csv_file):
+            tmp_file = f'{self.cache_csv_file}.tmp'
+            try:
+                with open(legacy_csv_file, 'rb') as source, gzip.open(
+                    tmp_file, 'wb'
+                ) as target:
+                    shutil.copyfileobj(source, target)
+                os.replace(tmp_file, self.cache_csv_file)
+            except OSError as e:
+                _LOGGER.warning("Could not compress cache file - %s", e)
+                return
+        os.remove(legacy_csv_file)
+
+    def _read_cache_rows(self):
+        """Read the cache CSV file in an executor, None if unavailable."""
+        try:
+            with open_csv(self.cache_csv_file) as file:
+                return list(csv.reader(file))
+        except (OSError, EOFError) as e:
+            _LOGGER.debug("Cache CSV file not loaded - %s", e)
+            return None
+
+    @callback
+    def _schedule_data(self, data, rows):
+        """Put rows in the shared schedule store and return a view of them."""
+        if rows is None:
+            return data
+        store = get_schedule_store(self.hass)
+        store.set_rows(self.house_id, rows)
+        return HouseSchedule(store, self.house_id, data.get("updated_at"))
 
     async def _async_update_data(self):
         _LOGGER.debug("Updating data")
 
-        data = await self.hass.async_add_executor_job(
-            get_latest_collection_info, self.house_id, self.updated_at, self.data, self.cache_csv_file
+        if self._cancel_event.is_set():
+            return self.data
+        self._job = run_dataset_job(
+            self.hass,
+            self._cancel_event,
+            get_latest_collection_info,
+            self.house_id,
+            self.updated_at,
+            self.data,
+            self.cache_csv_file,
+            self.source,
+            self.shared_cache,
         )
+        try:
+            data = await asyncio.wrap_future(self._job)
+        except DatasetCancelled:
+            _LOGGER.debug("Data update cancelled")
+            return self.data
+        finally:
+            self._job = None
+        if self._cancel_event.is_set():
+            return self.data
         if self.updated_at != data["updated_at"]:
             _LOGGER.debug('Writing cache file')
             
-            await self.hass.async_add_executor_job(self._write_cache_file, data)
+            await self.hass.async_add_executor_job(self._write_cache_file, dict(data))
+            rows = await self.hass.async_add_executor_job(self._read_cache_rows)
+            data = self._schedule_data(data, rows)
 
         self.updated_at = data["updated_at"]
         if self.updated_at is not None:
@@ -147,8 +242,28 @@ class HouseholdBinCoordinator(DataUpdateCoordinator):
 
     def _write_cache_file(self, data):
         """Write the cache file in an executor."""
-        with open(self.cache_file, 'w') as file:
+        tmp_file = f'{self.cache_file}.tmp'
+        with open(tmp_file, 'w') as file:
             json.dump(data, file)
+        os.replace(tmp_file, self.cache_file)
+
+    @callback
+    def cancel(self):
+        """Ask in-flight dataset work to stop at its next checkpoint."""
+        self._cancel_event.set()
+
+    async def async_cancel(self):
+        """Stop in-flight dataset work and wait briefly for it to exit."""
+        self.cancel()
+        job = self._job
+        if job is not None and not job.done():
+            _LOGGER.debug("Cancelling in-flight data update")
+            waiter = asyncio.wrap_future(job)
+            # the update task handles the outcome, this only waits for the exit
+            waiter.add_done_callback(
+                lambda future: future.cancelled() or future.exception()
+            )
+            await asyncio.wait({waiter}, timeout=CANCEL_TIMEOUT)
 
 class LeedsBinsDataSensor(CoordinatorEntity, SensorEntity):
     """Implementation of the UK Bin Collection Data sensor."""
@@ -0,0 +1,448 @@
+"""Dataset cache shared between several Home Assistant instances.
+
+Instances register the houses they track in a shared folder. Whichever
+instance takes the refresh lock downloads the jobs dataset, splits it into
+per-house schedules for every registered house and publishes them as a new
+version. The other instances read the published version without touching
+the network.
+
+Layout of the shared folder:
+    houses/<house_id>/<instance> instances tracking each house
+    manifest.json               current version, check time and folder
+    v<timestamp>/<house_id>.csv.gz
+    refresh.lock                held while refreshing
+"""
+
+import csv
+import json
+import logging
+import os
+import shutil
+import socket
+import time
+import uuid
+
+from .columnar import COLOURS
+from .leeds_bins_data_ import (
+    JOBS_CSV,
+    DatasetCancelled,
+    check_cancelled,
+    dataset_headers,
+    dataset_location,
+    find_next_dates,
+    iter_csv_rows,
+    open_csv,
+    open_dataset,
+    scan_jobs,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+HOUSES_DIR = "houses"
+MANIFEST_FILE = "manifest.json"
+LOCK_FILE = "refresh.lock"
+# id of this install, kept in the local cache folder
+INSTANCE_FILE = "instance_id"
+# seconds a published version is trusted before the dataset is checked again
+CHECK_INTERVAL = 3600
+# seconds without a heartbeat before a lock is treated as abandoned
+LOCK_STALE_SECONDS = 600
+# rows parsed between lock heartbeats
+HEARTBEAT_ROWS = 100000
+# published versions kept so readers of the previous one can finish
+KEEP_VERSIONS = 2
+
+
+class SharedCacheLockLost(Exception):
+    """The refresh lock was broken or taken by another instance."""
+
+
+class SharedCacheLock:
+    """Lock file guarding a refresh of the shared cache.
+
+    The lock is created with O_EXCL so it works on network filesystems
+    where flock is unreliable. The holder touches it while working. A lock
+    whose owner process has exited, or that has not been touched for
+    LOCK_STALE_SECONDS, is broken by the next instance that wants it. Each
+    acquisition writes a random token so a holder can tell if its lock was
+    broken and taken by someone else.
+
+    Containers on one host share its hostname but not its process ids, so
+    the owner's process is only checked for locks taken by this install.
+    """
+
+    def __init__(self, folder, instance):
+        """Prepare a lock in folder for the install named instance."""
+        self.path = os.path.join(folder, LOCK_FILE)
+        self.owner = {
+            "host": socket.gethostname(),
+            "instance": instance,
+            "pid": os.getpid(),
+        }
+        self.token = uuid.uuid4().hex
+        self.locked = False
+
+    def acquire(self):
+        """Try to take the lock without waiting, return True on success."""
+        for _ in range(2):
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                if not self._break_stale():
+                    return False
+                continue
+            with os.fdopen(fd, "w") as file:
+                json.dump(
+                    {**self.owner, "time": time.time(), "token": self.token}, file
+                )
+            self.locked = True
+            return True
+        return False
+
+    def owned(self):
+        """Return True if the lock file is still the one this lock wrote."""
+        current = self._read(self.path)
+        return current is not None and current[0].get("token") == self.token
+
+    def touch(self):
+        """Show the lock is still in use, raise SharedCacheLockLost if not held."""
+        if not self.locked:
+            return
+        if not self.owned():
+            self.locked = False
+            raise SharedCacheLockLost("Shared cache lock was taken by another instance")
+        os.utime(self.path)
+
+    def release(self):
+        """Release the lock if still held."""
+        if not self.locked:
+            return
+        self.locked = False
+        if not self.owned():
+            _LOGGER.warning("Shared cache lock was taken by another instance")
+            return
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            _LOGGER.warning("Shared cache lock was removed by another instance")
+
+    def _read(self, path):
+        """Return lock owner info and age, or None if the file is gone."""
+        try:
+            age = time.time() - os.stat(path).st_mtime
+            with open(path, "r") as file:
+                info = json.load(file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            # lock still being written, or written by a crashed instance
+            info = {}
+        return info, age
+
+    def _is_stale(self, info, age):
+        """Return True if a lock owner has gone away."""
+        if age > LOCK_STALE_SECONDS:
+            return True
+        if (
+            info.get("host") != self.owner["host"]
+            or info.get("instance") != self.owner["instance"]
+            or not info.get("pid")
+        ):
+            return False
+        try:
+            os.kill(info["pid"], 0)
+        except ProcessLookupError:
+            return True
+        except OSError:
+            return False
+        return False
+
+    def _break_stale(self):
+        """Remove an abandoned lock, return True if the lock is now free."""
+        current = self._read(self.path)
+        if current is None:
+            return True
+        if not self._is_stale(*current):
+            return False
+        # move it aside first so a lock taken meanwhile is not deleted
+        stale_path = f"{self.path}.{self.token}"
+        try:
+            os.rename(self.path, stale_path)
+        except FileNotFoundError:
+            return True
+        moved = self._read(stale_path)
+        if moved is not None and moved[0] != current[0]:
+            if not os.path.exists(self.path):
+                _LOGGER.debug("Shared cache lock changed hands, putting it back")
+                os.rename(stale_path, self.path)
+                return False
+            # the holder of the moved lock sees its token is gone and stops
+            _LOGGER.warning(
+                "Shared cache lock changed hands twice while breaking it, "
+                "displacing %s",
+                moved[0],
+            )
+            os.remove(stale_path)
+            return False
+        _LOGGER.warning("Breaking stale shared cache lock - %s", current[0])
+        os.remove(stale_path)
+        return True
+
+
+def instance_name(local_folder):
+    """Return the id of this install, created in local_folder on first use.
+
+    The id is random, so installs in containers that share a hostname and
+    config path still get different names.
+    """
+    path = os.path.join(local_folder, INSTANCE_FILE)
+    try:
+        with open(path, "r") as file:
+            return file.read().strip()
+    except FileNotFoundError:
+        pass
+    name = uuid.uuid4().hex
+    os.makedirs(local_folder, exist_ok=True)
+    tmp_path = f"{path}.{name}.tmp"
+    with open(tmp_path, "w") as file:
+        file.write(name)
+    try:
+        # link fails if another worker created the id first
+        os.link(tmp_path, path)
+    except FileExistsError:
+        pass
+    finally:
+        os.remove(tmp_path)
+    with open(path, "r") as file:
+        return file.read().strip()
+
+
+def register_house(folder, house_id, instance):
+    """Add house_id to the houses published in the shared cache."""
+    house_dir = os.path.join(folder, HOUSES_DIR, house_id)
+    if os.path.isfile(house_dir):
+        # registered by a version without per-instance entries
+        try:
+            os.remove(house_dir)
+        except FileNotFoundError:
+            pass
+    os.makedirs(house_dir, exist_ok=True)
+    path = os.path.join(house_dir, instance)
+    if not os.path.exists(path):
+        open(path, "a").close()
+
+
+def unregister_house(folder, house_id, instance):
+    """Stop publishing house_id for instance, and at all if none track it."""
+    house_dir = os.path.join(folder, HOUSES_DIR, house_id)
+    try:
+        os.remove(os.path.join(house_dir, instance))
+    except FileNotFoundError:
+        return
+    try:
+        os.rmdir(house_dir)
+    except OSError:
+        _LOGGER.debug("House still tracked by another instance - %s", house_id)
+
+
+def registered_houses(folder):
+    """Return the houses tracked by at least one instance."""
+    houses_dir = os.path.join(folder, HOUSES_DIR)
+    houses = set()
+    for house_id in os.listdir(houses_dir):
+        path = os.path.join(houses_dir, house_id)
+        if os.path.isfile(path) or os.listdir(path):
+            houses.add(house_id)
+    return houses
+
+
+def read_manifest(folder):
+    """Return the published manifest, or None if nothing is published."""
+    try:
+        with open(os.path.join(folder, MANIFEST_FILE), "r") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def write_manifest(folder, manifest):
+    """Replace the manifest atomically."""
+    path = os.path.join(folder, MANIFEST_FILE)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as file:
+        json.dump(manifest, file)
+    os.replace(tmp_path, path)
+
+
+def sweep_stale(folder):
+    """Remove files left by a refresh that did not finish, lock held."""
+    for name in os.listdir(folder):
+        if not name.endswith(".tmp"):
+            continue
+        path = os.path.join(folder, name)
+        if name.startswith("v"):
+            _LOGGER.debug("Removing unfinished shared schedules - %s", name)
+            shutil.rmtree(path, ignore_errors=True)
+        elif name.startswith(f"{MANIFEST_FILE}."):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def publish(folder, version, rows_by_house, lock, base=None, reuse=()):
+    """Write per-house schedules as a new version and make it current.
+
+    Schedules of the houses in reuse are linked from the base manifest's
+    version instead of being written again.
+    """
+    version_dir = f"v{time.time_ns()}"
+    tmp_dir = os.path.join(folder, f"{version_dir}.tmp")
+    os.makedirs(tmp_dir)
+    for house_id, rows in rows_by_house.items():
+        with open_csv(os.path.join(tmp_dir, f"{house_id}.csv.gz"), mode="w") as file:
+            csv.writer(file).writerows(rows)
+    for house_id in reuse:
+        source = os.path.join(folder, base["schedules"], f"{house_id}.csv.gz")
+        target = os.path.join(tmp_dir, f"{house_id}.csv.gz")
+        try:
+            os.link(source, target)
+        except OSError:
+            shutil.copyfile(source, target)
+    os.rename(tmp_dir, os.path.join(folder, version_dir))
+    manifest = {
+        "version": version,
+        "checked_at": time.time(),
+        "schedules": version_dir,
+        "houses": sorted({*rows_by_house, *reuse}),
+    }
+    lock.touch()
+    write_manifest(folder, manifest)
+    _LOGGER.info(
+        "Published shared schedules %s for %s houses, %s new",
+        version,
+        len(manifest["houses"]),
+        len(rows_by_house),
+    )
+
+    old_dirs = sorted(
+        name
+        for name in os.listdir(folder)
+        if name.startswith("v") and not name.endswith(".tmp")
+    )
+    for name in old_dirs[:-KEEP_VERSIONS]:
+        shutil.rmtree(os.path.join(folder, name), ignore_errors=True)
+    return manifest
+
+
+def with_heartbeat(rows, lock):
+    """Pass rows through, touching the lock every HEARTBEAT_ROWS rows."""
+    for count, row in enumerate(rows):
+        if count % HEARTBEAT_ROWS == 0:
+            lock.touch()
+        yield row
+
+
+def refresh_shared(folder, manifest, source, lock, cancel_event=None):
+    """Check the dataset and publish a new version if needed, lock held.
+
+    Raises SharedCacheLockLost if another instance takes the lock meanwhile.
+    """
+    sweep_stale(folder)
+    houses = registered_houses(folder)
+    location = dataset_location(source, JOBS_CSV)
+    status_code, headers = dataset_headers(location)
+    version = headers.get("Last-Modified")
+    if status_code != 200 or not version:
+        raise OSError(f"HTTP {status_code} checking {location}")
+    reuse = set()
+    if manifest is not None and manifest["version"] == version:
+        reuse = houses.intersection(manifest["houses"])
+        if reuse == houses:
+            _LOGGER.debug("Shared schedules are up to date")
+            manifest["checked_at"] = time.time()
+            lock.touch()
+            write_manifest(folder, manifest)
+            return manifest
+
+    scan = houses - reuse
+    _LOGGER.info("Refreshing shared waste collection data for %s houses", len(scan))
+    with open_dataset(location, cancel_event) as (text, fetched_version):
+        rows = with_heartbeat(iter_csv_rows(text, cancel_event), lock)
+        rows_by_house, _ = scan_jobs(rows, scan)
+    check_cancelled(cancel_event)
+    if fetched_version != version:
+        # the dataset changed since the check, the other houses catch up on
+        # their next refresh as they are missing from the new version
+        reuse = set()
+    return publish(folder, fetched_version, rows_by_house, lock, manifest, reuse)
+
+
+def read_schedule(folder, manifest, house_id):
+    """Return the published rows for house_id, or None if not published."""
+    if manifest is None or house_id not in manifest["houses"]:
+        return None
+    path = os.path.join(folder, manifest["schedules"], f"{house_id}.csv.gz")
+    try:
+        with open_csv(path) as file:
+            return list(csv.reader(file))
+    except FileNotFoundError:
+        return None
+
+
+def find_bin_days_shared(
+    house_id,
+    updated_at,
+    old_data,
+    cache_csv_file,
+    folder,
+    source=None,
+    cancel_event=None,
+):
+    """Find next bin days through the shared cache in folder.
+
+    Raises DatasetCancelled if cancel_event is set during a refresh.
+    """
+    try:
+        instance = instance_name(os.path.dirname(cache_csv_file))
+        register_house(folder, house_id, instance)
+        manifest = read_manifest(folder)
+        if (
+            manifest is None
+            or house_id not in manifest["houses"]
+            or time.time() - manifest["checked_at"] > CHECK_INTERVAL
+        ):
+            lock = SharedCacheLock(folder, instance)
+            if lock.acquire():
+                try:
+                    manifest = refresh_shared(folder, manifest, source, lock, cancel_event)
+                finally:
+                    lock.release()
+            else:
+                _LOGGER.debug("Another instance is refreshing the shared cache")
+        rows = read_schedule(folder, manifest, house_id)
+    except DatasetCancelled:
+        raise
+    except Exception as e:
+        check_cancelled(cancel_event)
+        _LOGGER.error("Failed to use shared cache - %s", e)
+        return old_data
+    if rows is None:
+        _LOGGER.debug("House not published in shared cache yet - %s", house_id)
+        return old_data
+    if manifest["version"] == updated_at:
+        _LOGGER.debug("Shared schedules not updated since last check")
+        return old_data
+
+    # keep a local copy for the schedule API and for offline fallback
+    try:
+        with open_csv(cache_csv_file, mode="w") as file:
+            csv.writer(file).writerows(rows)
+    except Exception as e:
+        _LOGGER.error("Failed to write to cache file - %s", e)
+        return old_data
+    next_dates = dict.fromkeys(COLOURS)
+    next_dates.update(find_next_dates(rows, {house_id})[house_id])
+    next_dates["updated_at"] = manifest["version"]
+    _LOGGER.info("Next Collection Dates from shared cache: %s", next_dates)
+    return next_dates
@@ -0,0 +1,30 @@
+"""Shared helpers for Leeds Bins tests."""
+
+from datetime import datetime, timedelta
+import random
+
+NOW_VALUES = [
+    datetime(2024, 5, 10, 0, 0),
+    datetime(2024, 5, 10, 9, 30),
+    # today and tomorrow are equally far away, file order decides
+    datetime(2024, 5, 10, 12, 0),
+    datetime(2024, 5, 10, 23, 59, 59, 999999),
+]
+
+
+def make_rows(seed):
+    """Return a shuffled jobs file with noise rows and mixed date formats."""
+    rng = random.Random(seed)
+    rows = [["PremisesID", "BinType", "JobDate"]]
+    for _ in range(3000):
+        day = datetime(2024, 5, 1) + timedelta(days=rng.randrange(30))
+        date_format = rng.choice(["%d/%m/%y", "%-d/%m/%y"])
+        rows.append(
+            [
+                str(rng.randrange(200)),
+                rng.choice(["BROWN", "BLACK", "GREEN", "OTHER"]),
+                day.strftime(date_format),
+            ]
+        )
+    rows.append([])
+    return rows
@@ -0,0 +1,84 @@
+"""Fixtures for Leeds Bins tests."""
+
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import time
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations):
+    """Enable loading custom_components/leeds_bins in every test."""
+    yield
+
+
+class DatasetServer(ThreadingHTTPServer):
+    """Serve dataset files with a Last-Modified that tests can bump.
+
+    Setting stall makes GET send half of the body and then wait until
+    release is set, like a transfer that has stopped making progress.
+    """
+
+    def __init__(self):
+        """Bind to a free local port."""
+        super().__init__(("127.0.0.1", 0), DatasetHandler)
+        self.files = {"/dm_jobs.csv": b"", "/dm_premises.csv": b""}
+        self.last_modified = time.time() - 3600
+        self.stall = False
+        self.stalled = threading.Event()
+        self.release = threading.Event()
+
+    @property
+    def url(self):
+        """Return the base URL of the server."""
+        return f"http://127.0.0.1:{self.server_port}"
+
+
+class DatasetHandler(BaseHTTPRequestHandler):
+    """Answer HEAD and GET for the dataset files."""
+
+    def _send_headers(self):
+        body = self.server.files.get(self.path)
+        if body is None:
+            self.send_error(404)
+            return None
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header(
+            "Last-Modified", formatdate(self.server.last_modified, usegmt=True)
+        )
+        self.end_headers()
+        return body
+
+    def do_HEAD(self):
+        self._send_headers()
+
+    def do_GET(self):
+        body = self._send_headers()
+        if body is None:
+            return
+        if self.server.stall:
+            self.wfile.write(body[: len(body) // 2])
+            self.wfile.flush()
+            self.server.stalled.set()
+            self.server.release.wait(30)
+            return
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def dataset_server(socket_enabled):
+    """Run a local stand-in for the dataset host."""
+    server = DatasetServer()
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    yield server
+    server.release.set()
+    server.shutdown()
+    server.server_close()
+    thread.join()
@@ -0,0 +1,50 @@
+"""Tests for the per-house JSON cache file."""
+
+import json
+import os
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.leeds_bins.sensor import HouseholdBinCoordinator
+
+
+async def test_corrupt_cache_file_is_ignored(hass: HomeAssistant, tmp_path) -> None:
+    """A truncated cache file falls back to a first refresh."""
+    hass.config.config_dir = str(tmp_path)
+    coordinator = HouseholdBinCoordinator(hass, "1000", "House")
+    os.makedirs(coordinator.folder)
+    with open(coordinator.cache_file, "w") as file:
+        file.write('{"BLACK": "01/0')
+
+    assert not await coordinator.async_load_cache_file()
+
+
+async def test_cache_file_round_trip(hass: HomeAssistant, tmp_path) -> None:
+    """The cache file is replaced whole and leaves no temporary file."""
+    hass.config.config_dir = str(tmp_path)
+    coordinator = HouseholdBinCoordinator(hass, "1000", "House")
+    data = {"BLACK": "01/01/30", "GREEN": None, "BROWN": None, "updated_at": None}
+    await hass.async_add_executor_job(coordinator._load_cache_file)
+    await hass.async_add_executor_job(coordinator._write_cache_file, data)
+
+    assert await coordinator.async_load_cache_file()
+    assert coordinator.data == data
+    assert os.listdir(coordinator.folder) == ["1000.json"]
+    with open(coordinator.cache_file) as file:
+        assert json.load(file) == data
+
+
+async def test_legacy_cache_csv_is_compressed(hass: HomeAssistant, tmp_path) -> None:
+    """A plain cache CSV from an older version is kept as a gzip file."""
+    hass.config.config_dir = str(tmp_path)
+    coordinator = HouseholdBinCoordinator(hass, "1000", "House")
+    os.makedirs(coordinator.folder)
+    legacy_csv_file = os.path.join(coordinator.folder, "1000.csv")
+    with open(legacy_csv_file, "w") as file:
+        file.write("1000,BLACK,01/01/30\r\n")
+
+    await hass.async_add_executor_job(coordinator._load_cache_file)
+
+    assert os.listdir(coordinator.folder) == ["1000.csv.gz"]
+    rows = await hass.async_add_executor_job(coordinator._read_cache_rows)
+    assert rows == [["1000", "BLACK", "01/01/30"]]
@@ -0,0 +1,75 @@
+"""Tests for cancelling dataset work when an entry is unloaded."""
+
+import csv
+from datetime import datetime, timedelta
+import io
+import os
+import threading
+import time
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from homeassistant.core import HomeAssistant
+from homeassistant.setup import async_setup_component
+
+from custom_components.leeds_bins.const import (
+    CONF_HOUSE,
+    CONF_HOUSE_ID,
+    CONF_NAME,
+    CONF_POSTCODE,
+    CONF_SOURCE,
+    DOMAIN,
+)
+from custom_components.leeds_bins.executor import CANCEL_TIMEOUT
+
+
+def build_jobs_csv():
+    """Return a jobs file for house 1000 among many others."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    day = (datetime.now() + timedelta(days=3)).strftime("%d/%m/%y")
+    for house in range(1000, 6000):
+        writer.writerow([str(house), "BLACK", day])
+    return buffer.getvalue().encode()
+
+
+async def test_unload_interrupts_stalled_download(
+    hass: HomeAssistant, tmp_path, dataset_server
+) -> None:
+    """Unload ends a stalled download in time and leaves the cache alone."""
+    hass.config.config_dir = str(tmp_path)
+    dataset_server.files["/dm_jobs.csv"] = build_jobs_csv()
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={
+            CONF_NAME: "Home",
+            CONF_HOUSE: "1",
+            CONF_POSTCODE: "LS1 1AA",
+            CONF_HOUSE_ID: "1000",
+            CONF_SOURCE: dataset_server.url,
+        },
+    )
+    entry.add_to_hass(hass)
+    assert await async_setup_component(hass, DOMAIN, {})
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    updated_at = coordinator.data["updated_at"]
+    cache_csv_file = coordinator.cache_csv_file
+    cache_mtime = os.stat(cache_csv_file).st_mtime_ns
+
+    dataset_server.stall = True
+    dataset_server.last_modified = time.time()
+    refresh = hass.async_create_task(coordinator.async_refresh())
+    assert await hass.async_add_executor_job(dataset_server.stalled.wait, 10)
+
+    start = time.monotonic()
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    assert time.monotonic() - start < CANCEL_TIMEOUT
+    await refresh
+
+    for thread in threading.enumerate():
+        if thread.name.startswith("leeds_bins"):
+            await hass.async_add_executor_job(thread.join, CANCEL_TIMEOUT)
+            assert not thread.is_alive()
+    assert coordinator.data["updated_at"] == updated_at
+    assert os.stat(cache_csv_file).st_mtime_ns == cache_mtime
@@ -0,0 +1,63 @@
+"""Tests for the NumPy columnar engine and its pure-Python fallback."""
+
+import pytest
+
+from custom_components.leeds_bins import leeds_bins_data_
+from custom_components.leeds_bins.columnar import COLUMNAR_MIN_HOUSES
+from custom_components.leeds_bins.leeds_bins_data_ import scan_jobs
+
+from .common import NOW_VALUES, make_rows
+
+pytest.importorskip("numpy")
+
+
+@pytest.mark.parametrize("now", NOW_VALUES)
+@pytest.mark.parametrize("seed", range(5))
+def test_engines_match(monkeypatch, seed, now):
+    """The NumPy engine returns exactly what the Python path returns."""
+    rows = make_rows(seed)
+    house_ids = {str(house) for house in range(0, 220, 3)}
+
+    monkeypatch.setattr(leeds_bins_data_, "COLUMNAR_MIN_HOUSES", 0)
+    columnar = scan_jobs(iter(rows), house_ids, now)
+    monkeypatch.setattr(leeds_bins_data_, "HAS_NUMPY", False)
+    python = scan_jobs(iter(rows), house_ids, now)
+
+    assert columnar == python
+    for house_rows in columnar[0].values():
+        assert all(type(value) is str for row in house_rows for value in row)
+    for dates in columnar[1].values():
+        assert all(value is None or type(value) is str for value in dates.values())
+
+
+def test_engine_chunks(monkeypatch):
+    """Rows split across several chunks give the same result."""
+    rows = make_rows(7)
+    house_ids = {"1", "2", "3"}
+    now = NOW_VALUES[1]
+
+    monkeypatch.setattr(leeds_bins_data_, "COLUMNAR_MIN_HOUSES", 0)
+    expected = scan_jobs(iter(rows), house_ids, now)
+    monkeypatch.setattr("custom_components.leeds_bins.columnar.CHUNK_ROWS", 7)
+    assert scan_jobs(iter(rows), house_ids, now) == expected
+
+
+@pytest.mark.parametrize(
+    ("houses", "columnar"), [(1, False), (COLUMNAR_MIN_HOUSES, True)]
+)
+def test_engine_chosen_by_house_count(monkeypatch, houses, columnar):
+    """Only scans for many houses use the NumPy engine.
+
+    See benchmarks/scan_jobs.py for timings of both engines.
+    """
+    calls = []
+    load = leeds_bins_data_.load_columns
+
+    def spy(rows, house_ids):
+        calls.append(len(house_ids))
+        return load(rows, house_ids)
+
+    monkeypatch.setattr(leeds_bins_data_, "load_columns", spy)
+    house_ids = {str(house) for house in range(houses)}
+    scan_jobs(iter(make_rows(3)), house_ids, NOW_VALUES[1])
+    assert bool(calls) is columnar
@@ -0,0 +1,208 @@
+"""Event loop blocking harness for setup, refresh and unload of many entries.
+
+A local HTTP server stands in for opendata.leeds.gov.uk. Every filesystem
+and HTTP call made from integration code on the event loop thread is
+counted, and the loop's scheduling lag is sampled throughout.
+"""
+
+import asyncio
+import builtins
+import csv
+import io
+import linecache
+import os
+import shutil
+import sys
+import sysconfig
+import threading
+import time
+
+import pytest
+import requests
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from homeassistant.core import HomeAssistant
+from homeassistant.setup import async_setup_component
+
+from custom_components.leeds_bins.const import (
+    CONF_HOUSE,
+    CONF_HOUSE_ID,
+    CONF_NAME,
+    CONF_POSTCODE,
+    CONF_SOURCE,
+    DOMAIN,
+)
+from custom_components.leeds_bins.schedule_store import (
+    HouseSchedule,
+    get_schedule_store,
+)
+
+ENTRIES = 25
+NOISE_HOUSES = 2000
+# blocking calls from integration code allowed on the loop thread
+BLOCKING_CALL_BUDGET = 0
+# worst case delay, in seconds, of a 5 ms sleep on the loop
+LOOP_LAG_BUDGET = 0.25
+
+INTEGRATION_DIR = os.path.join("custom_components", "leeds_bins")
+SITE_PACKAGES = sysconfig.get_paths()["purelib"]
+# frames that only pass a call through on behalf of their caller
+WRAPPER_PATHS = (
+    sysconfig.get_paths()["stdlib"],
+    os.path.dirname(requests.__file__),
+    os.path.dirname(requests.packages.urllib3.__file__),
+    __file__,
+)
+
+
+def is_wrapper(filename):
+    """Return True if filename belongs to the standard library or requests."""
+    if filename.startswith(SITE_PACKAGES):
+        return filename.startswith(WRAPPER_PATHS[1:])
+    return filename.startswith(WRAPPER_PATHS)
+
+
+def build_jobs_csv():
+    """Return a jobs file covering the tracked houses and some noise."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for house in range(ENTRIES + NOISE_HOUSES):
+        for colour in ("BLACK", "GREEN", "BROWN"):
+            for week in range(26):
+                day = time.gmtime(time.time() + (week * 14 + house % 7) * 86400)
+                writer.writerow([str(1000 + house), colour, time.strftime("%d/%m/%y", day)])
+    return buffer.getvalue().encode()
+
+
+class BlockingCallAudit:
+    """Count filesystem and HTTP calls from integration code on the loop."""
+
+    TARGETS = [
+        (builtins, "open"),
+        (os, "stat"),
+        (os, "listdir"),
+        (os, "makedirs"),
+        (os, "remove"),
+        (os, "replace"),
+        (os, "rename"),
+        (os.path, "exists"),
+        (os.path, "isfile"),
+        (shutil, "rmtree"),
+        (requests.sessions.Session, "request"),
+    ]
+
+    def __init__(self, monkeypatch, loop_thread):
+        """Wrap every target."""
+        self.loop_thread = loop_thread
+        self.calls = []
+        for owner, name in self.TARGETS:
+            monkeypatch.setattr(owner, name, self._wrap(name, getattr(owner, name)))
+
+    def _from_integration(self):
+        """Return the integration call site, if integration code made the call.
+
+        The nearest caller outside the standard library and requests is
+        the one responsible, so calls made by Home Assistant itself while
+        running integration code are not counted.
+        """
+        frame = sys._getframe(2)
+        while frame is not None and is_wrapper(frame.f_code.co_filename):
+            if frame.f_code.co_filename == linecache.__file__:
+                # asyncio debug mode reading source for future tracebacks
+                return None
+            frame = frame.f_back
+        if frame is not None and INTEGRATION_DIR in frame.f_code.co_filename:
+            return f"{frame.f_code.co_filename}:{frame.f_lineno}"
+        return None
+
+    def _wrap(self, name, func):
+        def audited(*args, **kwargs):
+            if threading.get_ident() == self.loop_thread:
+                caller = self._from_integration()
+                if caller is not None:
+                    self.calls.append(f"{name} from {caller}")
+            return func(*args, **kwargs)
+
+        return audited
+
+
+class LoopLagMonitor:
+    """Record how late the loop runs a short sleep."""
+
+    def __init__(self):
+        """Start with no samples."""
+        self.max_lag = 0.0
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(0.005)
+            self.max_lag = max(self.max_lag, loop.time() - start - 0.005)
+
+    def start(self, hass):
+        """Start sampling on the hass loop."""
+        self._task = hass.loop.create_task(self._run())
+
+    async def stop(self):
+        """Stop sampling."""
+        self._task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await self._task
+
+
+async def test_many_entries_do_not_block_loop(
+    hass: HomeAssistant, tmp_path, monkeypatch, dataset_server
+) -> None:
+    """Set up, refresh and unload many entries within the loop budgets."""
+    hass.config.config_dir = str(tmp_path)
+    dataset_server.files["/dm_jobs.csv"] = build_jobs_csv()
+    entries = []
+    for index in range(ENTRIES):
+        entry = MockConfigEntry(
+            domain=DOMAIN,
+            title=f"House {index}",
+            data={
+                CONF_NAME: f"House {index}",
+                CONF_HOUSE: str(index),
+                CONF_POSTCODE: "LS1 1AA",
+                CONF_HOUSE_ID: str(1000 + index),
+                CONF_SOURCE: dataset_server.url,
+            },
+        )
+        entry.add_to_hass(hass)
+        entries.append(entry)
+
+    audit = BlockingCallAudit(monkeypatch, threading.get_ident())
+    monitor = LoopLagMonitor()
+    monitor.start(hass)
+
+    # setup downloads and parses the jobs file once per entry
+    assert await async_setup_component(hass, DOMAIN, {})
+    await hass.async_block_till_done()
+    coordinators = list(hass.data[DOMAIN].values())
+    assert len(coordinators) == ENTRIES
+    for coordinator in coordinators:
+        assert isinstance(coordinator.data, HouseSchedule)
+        assert coordinator.data["BLACK"] not in (None, "no_data")
+
+    # newer data on the server makes every entry download again
+    dataset_server.last_modified = time.time()
+    await asyncio.gather(*(coordinator.async_refresh() for coordinator in coordinators))
+    for coordinator in coordinators:
+        assert coordinator.last_update_success
+
+    for entry in entries:
+        assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+    await monitor.stop()
+    assert not len(get_schedule_store(hass))
+
+    assert len(audit.calls) <= BLOCKING_CALL_BUDGET, "\n".join(audit.calls)
+    assert monitor.max_lag <= LOOP_LAG_BUDGET
+
+    # the worker pool is shut down with the last entry
+    for thread in threading.enumerate():
+        if thread.name.startswith("leeds_bins"):
+            await hass.async_add_executor_job(thread.join, 5)
@@ -0,0 +1,65 @@
+"""Tests for options overriding the settings made at setup."""
+
+import csv
+from datetime import datetime, timedelta
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from homeassistant.core import HomeAssistant
+from homeassistant.setup import async_setup_component
+
+from custom_components.leeds_bins.const import (
+    CONF_HOUSE,
+    CONF_HOUSE_ID,
+    CONF_NAME,
+    CONF_POSTCODE,
+    CONF_SOURCE,
+    DOMAIN,
+)
+
+
+def write_jobs(folder):
+    """Write a jobs file with a collection for houses 1000 and 1001."""
+    day = (datetime.now() + timedelta(days=3)).strftime("%d/%m/%y")
+    with open(folder / "dm_jobs.csv", "w", newline="") as file:
+        csv.writer(file).writerows([["1000", "BLACK", day], ["1001", "GREEN", day]])
+    return day
+
+
+async def test_options_override_data(hass: HomeAssistant, tmp_path) -> None:
+    """Options saved by the options flow are used, and reload the entry."""
+    hass.config.config_dir = str(tmp_path)
+    dataset = tmp_path / "dataset"
+    dataset.mkdir()
+    day = await hass.async_add_executor_job(write_jobs, dataset)
+    data = {
+        CONF_NAME: "Home",
+        CONF_HOUSE: "1",
+        CONF_POSTCODE: "LS1 1AA",
+        CONF_HOUSE_ID: "999",
+        CONF_SOURCE: "",
+    }
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data=data,
+        options={**data, CONF_HOUSE_ID: "1000", CONF_SOURCE: str(dataset)},
+    )
+    entry.add_to_hass(hass)
+
+    assert await async_setup_component(hass, DOMAIN, {})
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    assert coordinator.house_id == "1000"
+    assert coordinator.source == str(dataset)
+    assert coordinator.data["BLACK"] == day
+
+    hass.config_entries.async_update_entry(
+        entry, options={**entry.options, CONF_HOUSE_ID: "1001"}
+    )
+    await hass.async_block_till_done()
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    assert coordinator.house_id == "1001"
+    assert coordinator.data["GREEN"] == day
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
@@ -0,0 +1,190 @@
+"""Tests for the bulk schedule websocket command and service."""
+
+import csv
+from datetime import timedelta
+import json
+import logging
+import os
+from unittest.mock import patch
+
+import pytest
+from pytest_homeassistant_custom_component.common import CLIENT_ID, MockConfigEntry
+
+from homeassistant.components import websocket_api
+from homeassistant.core import HomeAssistant
+from homeassistant.setup import async_setup_component
+import homeassistant.util.dt as dt_util
+
+from custom_components.leeds_bins.const import (
+    CONF_HOUSE,
+    CONF_HOUSE_ID,
+    CONF_NAME,
+    CONF_POSTCODE,
+    CONF_SOURCE,
+    DOMAIN,
+)
+from custom_components.leeds_bins.schedule_api import (
+    SERVICE_GET_SCHEDULES,
+    WS_TYPE_SCHEDULES,
+)
+
+
+def day(offset):
+    """Return a date offset from today."""
+    return dt_util.now().date() + timedelta(days=offset)
+
+
+def dataset_date(offset):
+    """Return a date offset from today as written in the dataset."""
+    return day(offset).strftime("%d/%m/%y")
+
+
+def write_files(config_dir, dataset):
+    """Write a jobs file, and a JSON cache without CSV for house 1002."""
+    os.makedirs(dataset)
+    with open(os.path.join(dataset, "dm_jobs.csv"), "w", newline="") as file:
+        csv.writer(file).writerows(
+            [
+                ["1000", "BLACK", dataset_date(-1)],
+                ["1000", "BLACK", dataset_date(3)],
+                ["1000", "GREEN", dataset_date(10)],
+                ["1000", "BROWN", dataset_date(20)],
+                ["1001", "BLACK", dataset_date(5)],
+            ]
+        )
+    cache = os.path.join(config_dir, "custom_components", DOMAIN, "cache")
+    os.makedirs(cache)
+    with open(os.path.join(cache, "1002.json"), "w") as file:
+        json.dump(
+            {
+                "BLACK": dataset_date(7),
+                "GREEN": None,
+                "BROWN": None,
+                "updated_at": "Mon, 01 Jan 2024 00:00:00 GMT",
+            },
+            file,
+        )
+
+
+@pytest.fixture
+async def houses(hass: HomeAssistant, tmp_path):
+    """Set up houses 1000 and 1001 from a local dataset and 1002 from cache.
+
+    Yields a mock of run_dataset_job, patched in once setup is done.
+    """
+    hass.config.config_dir = str(tmp_path)
+    dataset = str(tmp_path / "dataset")
+    await hass.async_add_executor_job(write_files, str(tmp_path), dataset)
+    for house_id in ("1000", "1001", "1002"):
+        MockConfigEntry(
+            domain=DOMAIN,
+            data={
+                CONF_NAME: f"House {house_id}",
+                CONF_HOUSE: "1",
+                CONF_POSTCODE: "LS1 1AA",
+                CONF_HOUSE_ID: house_id,
+                CONF_SOURCE: dataset,
+            },
+        ).add_to_hass(hass)
+    assert await async_setup_component(hass, DOMAIN, {})
+    await hass.async_block_till_done()
+    with patch("custom_components.leeds_bins.sensor.run_dataset_job") as job:
+        yield job
+    for entry in hass.config_entries.async_entries(DOMAIN):
+        assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+
+
+async def get_schedules(hass, **data):
+    """Call the get_schedules service and return its response."""
+    return await hass.services.async_call(
+        DOMAIN, SERVICE_GET_SCHEDULES, data, blocking=True, return_response=True
+    )
+
+
+def collections(response, house_id):
+    """Return (colour, date) pairs for a house in a response."""
+    return [
+        (collection["colour"], collection["date"])
+        for collection in response["houses"][house_id]["collections"]
+    ]
+
+
+async def test_filters(hass: HomeAssistant, houses) -> None:
+    """Houses, colours and the date range narrow the result."""
+    response = await get_schedules(
+        hass,
+        house_ids=["1000"],
+        colours=["BLACK", "GREEN"],
+        end_date=day(10).isoformat(),
+    )
+
+    assert list(response["houses"]) == ["1000"]
+    assert collections(response, "1000") == [
+        ("BLACK", day(3).isoformat()),
+        ("GREEN", day(10).isoformat()),
+    ]
+    assert response["houses"]["1000"]["name"] == "House 1000"
+    houses.assert_not_called()
+
+
+async def test_start_date(hass: HomeAssistant, houses) -> None:
+    """Collections start today unless an earlier start date is given."""
+    response = await get_schedules(hass, house_ids="1000", colours="BLACK")
+    assert collections(response, "1000") == [("BLACK", day(3).isoformat())]
+
+    response = await get_schedules(
+        hass, house_ids="1000", colours="BLACK", start_date=day(-1).isoformat()
+    )
+    assert collections(response, "1000") == [
+        ("BLACK", day(-1).isoformat()),
+        ("BLACK", day(3).isoformat()),
+    ]
+    houses.assert_not_called()
+
+
+async def test_house_without_cache_csv(hass: HomeAssistant, houses) -> None:
+    """Next dates are used for a house whose cache CSV is missing."""
+    response = await get_schedules(hass)
+
+    assert sorted(response["houses"]) == ["1000", "1001", "1002"]
+    assert collections(response, "1002") == [("BLACK", day(7).isoformat())]
+    assert collections(response, "1001") == [("BLACK", day(5).isoformat())]
+    houses.assert_not_called()
+
+
+def decode(message):
+    """Return a websocket message as sent, which may be serialised already."""
+    if isinstance(message, (str, bytes)):
+        return json.loads(message)
+    return message
+
+
+async def test_websocket(hass: HomeAssistant, houses, hass_admin_user) -> None:
+    """The websocket command validates and normalises its fields."""
+    messages = []
+    refresh_token = await hass.auth.async_create_refresh_token(
+        hass_admin_user, CLIENT_ID
+    )
+    connection = websocket_api.ActiveConnection(
+        logging.getLogger(__name__),
+        hass,
+        messages.append,
+        hass_admin_user,
+        refresh_token,
+    )
+
+    connection.async_handle(
+        {"id": 1, "type": WS_TYPE_SCHEDULES, "house_ids": "1000", "colours": ["green"]}
+    )
+    await hass.async_block_till_done()
+    msg = decode(messages.pop())
+    assert msg["success"]
+    assert collections(msg["result"], "1000") == [("GREEN", day(10).isoformat())]
+
+    connection.async_handle({"id": 2, "type": WS_TYPE_SCHEDULES, "colours": ["red"]})
+    await hass.async_block_till_done()
+    msg = decode(messages.pop())
+    assert not msg["success"]
+    assert msg["error"]["code"] == "invalid_format"
+    houses.assert_not_called()
@@ -0,0 +1,103 @@
+"""Tests for the shared schedule store."""
+
+from datetime import datetime
+import random
+
+import pytest
+
+from custom_components.leeds_bins.leeds_bins_data_ import find_next_dates
+from custom_components.leeds_bins.schedule_store import HouseSchedule, ScheduleStore
+
+from .common import NOW_VALUES, make_rows
+
+
+@pytest.mark.parametrize("now", NOW_VALUES)
+@pytest.mark.parametrize("seed", range(5))
+def test_next_dates_match(seed, now):
+    """The store picks the same dates as find_next_dates, ties included."""
+    rows = make_rows(seed)
+    store = ScheduleStore.from_rows(rows)
+    house_ids = {str(house) for house in range(200)}
+
+    expected = find_next_dates(
+        [row for row in rows if len(row) >= 3 and row[1] != "OTHER"], house_ids, now
+    )
+    for house_id in house_ids:
+        assert store.next_dates(house_id, now) == expected[house_id]
+
+
+def test_noon_tie_uses_file_order():
+    """At exactly noon today and tomorrow tie and the first row wins."""
+    now = datetime(2024, 5, 10, 12, 0)
+    store = ScheduleStore()
+    store.set_rows("1", [["1", "BLACK", "11/05/24"], ["1", "BLACK", "10/05/24"]])
+    store.set_rows("2", [["2", "BLACK", "10/05/24"], ["2", "BLACK", "11/05/24"]])
+
+    assert store.next_dates("1", now)["BLACK"] == "11/05/24"
+    assert store.next_dates("2", now)["BLACK"] == "10/05/24"
+
+
+def test_replace_and_remove_compact():
+    """Replaced and removed schedules are reclaimed without losing others."""
+    rng = random.Random(1)
+    store = ScheduleStore()
+    expected = {}
+    for _ in range(200):
+        house_id = str(rng.randrange(20))
+        rows = make_rows(rng.randrange(1000))[1:40]
+        rows = [[house_id, *row[1:]] for row in rows if len(row) >= 3]
+        store.set_rows(house_id, rows)
+        expected[house_id] = [
+            (row[1], datetime.strptime(row[2], "%d/%m/%y").date())
+            for row in rows
+            if row[1] != "OTHER"
+        ]
+        if rng.random() < 0.2:
+            store.remove(house_id)
+            del expected[house_id]
+
+    assert len(store.dates) <= 2 * len(store)
+    for house_id in map(str, range(20)):
+        schedule = [(entry.colour, entry.date) for entry in store.schedule(house_id)]
+        assert schedule == expected.get(house_id, [])
+        assert (house_id in store) == (house_id in expected)
+
+
+def test_house_schedule_view():
+    """The view reads like the next dates dict returned by find_bin_days."""
+    now = datetime(2024, 5, 10, 9, 30)
+    store = ScheduleStore()
+    store.set_rows("1", [["1", "BLACK", "10/05/24"], ["1", "GREEN", "17/05/24"]])
+    updated_at = "Fri, 10 May 2024 06:00:00 GMT"
+
+    view = HouseSchedule(store, "1", updated_at, now)
+    assert dict(view) == {
+        "BROWN": None,
+        "BLACK": "10/05/24",
+        "GREEN": "17/05/24",
+        "updated_at": updated_at,
+    }
+
+    store.remove("1")
+    assert view["BLACK"] == "no_data"
+    with pytest.raises(KeyError):
+        view["OTHER"]
+
+
+def test_house_schedule_scans_once(monkeypatch):
+    """Reading every key of the view works out the next dates once."""
+    store = ScheduleStore()
+    store.set_rows("1", [["1", "BLACK", "10/05/24"]])
+    calls = []
+    next_dates = ScheduleStore.next_dates
+
+    def spy(self, house_id, now=None):
+        calls.append(house_id)
+        return next_dates(self, house_id, now)
+
+    monkeypatch.setattr(ScheduleStore, "next_dates", spy)
+    view = HouseSchedule(store, "1", None, datetime(2024, 5, 10, 9, 30))
+    for _ in range(3):
+        dict(view.items())
+        view["BLACK"]
+    assert calls == ["1"]
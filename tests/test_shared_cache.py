@@ -0,0 +1,237 @@
+"""Tests for the dataset cache shared between instances."""
+
+import csv
+from datetime import datetime, timedelta
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+from custom_components.leeds_bins import shared_cache
+from custom_components.leeds_bins.shared_cache import (
+    LOCK_STALE_SECONDS,
+    SharedCacheLock,
+    SharedCacheLockLost,
+    find_bin_days_shared,
+    instance_name,
+    read_manifest,
+    refresh_shared,
+    register_house,
+    registered_houses,
+    unregister_house,
+)
+
+DAY = (datetime.now() + timedelta(days=3)).strftime("%d/%m/%y")
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    """Return a local dataset folder with jobs for houses 1 to 3."""
+    folder = tmp_path / "dataset"
+    folder.mkdir()
+    with open(folder / "dm_jobs.csv", "w", newline="") as file:
+        csv.writer(file).writerows(
+            [[str(house), "BLACK", DAY] for house in range(1, 4)]
+        )
+    return str(folder)
+
+
+@pytest.fixture
+def folder(tmp_path):
+    """Return an empty shared cache folder."""
+    path = tmp_path / "shared"
+    path.mkdir()
+    return str(path)
+
+
+def refresh(folder, dataset):
+    """Run a refresh holding the lock."""
+    lock = SharedCacheLock(folder, "a")
+    assert lock.acquire()
+    try:
+        return refresh_shared(folder, read_manifest(folder), dataset, lock)
+    finally:
+        lock.release()
+
+
+def test_unregister_keeps_houses_of_other_instances(folder):
+    """A house stays registered while any instance tracks it."""
+    register_house(folder, "1", "a")
+    register_house(folder, "1", "b")
+    register_house(folder, "2", "a")
+
+    unregister_house(folder, "1", "a")
+    unregister_house(folder, "2", "a")
+    assert registered_houses(folder) == {"1"}
+    unregister_house(folder, "1", "b")
+    assert registered_houses(folder) == set()
+
+
+def test_new_house_reuses_published_schedules(folder, dataset, monkeypatch):
+    """Adding a house scans only for it and links the other schedules."""
+    register_house(folder, "1", "a")
+    first = refresh(folder, dataset)
+
+    scanned = []
+    scan_jobs = shared_cache.scan_jobs
+
+    def spy(rows, house_ids):
+        scanned.append(set(house_ids))
+        return scan_jobs(rows, house_ids)
+
+    monkeypatch.setattr(shared_cache, "scan_jobs", spy)
+    register_house(folder, "2", "a")
+    second = refresh(folder, dataset)
+
+    assert scanned == [{"2"}]
+    assert second["version"] == first["version"]
+    assert second["houses"] == ["1", "2"]
+    assert os.path.samefile(
+        os.path.join(folder, first["schedules"], "1.csv.gz"),
+        os.path.join(folder, second["schedules"], "1.csv.gz"),
+    )
+
+
+def test_refresh_sweeps_unfinished_files(folder, dataset):
+    """Files left by an interrupted refresh are removed."""
+    os.makedirs(os.path.join(folder, "v1.tmp"))
+    open(os.path.join(folder, "manifest.json.123.tmp"), "w").close()
+    register_house(folder, "1", "a")
+    manifest = refresh(folder, dataset)
+
+    assert sorted(os.listdir(folder)) == sorted(
+        ["houses", "manifest.json", manifest["schedules"]]
+    )
+
+
+def test_lost_lock_aborts_refresh(folder, dataset, monkeypatch):
+    """A holder whose lock was taken stops and leaves the new lock alone."""
+    register_house(folder, "1", "a")
+    lock = SharedCacheLock(folder, "a")
+    assert lock.acquire()
+    with open(lock.path, "w") as file:
+        json.dump({"host": "other", "pid": 1, "token": "other"}, file)
+    monkeypatch.setattr(shared_cache, "HEARTBEAT_ROWS", 1)
+
+    with pytest.raises(SharedCacheLockLost):
+        refresh_shared(folder, None, dataset, lock)
+    lock.release()
+
+    assert read_manifest(folder) is None
+    assert os.path.exists(lock.path)
+
+
+def test_find_bin_days_shared(folder, dataset, tmp_path):
+    """Next dates come from the published schedules."""
+    cache_csv_file = str(tmp_path / "1.csv.gz")
+    next_dates = find_bin_days_shared("1", None, None, cache_csv_file, folder, dataset)
+
+    assert next_dates["BLACK"] == DAY
+    assert os.listdir(os.path.join(folder, "houses", "1")) == [
+        shared_cache.instance_name(str(tmp_path))
+    ]
+
+
+def dead_pid():
+    """Return the id of a process that has exited."""
+    process = subprocess.Popen([sys.executable, "-c", ""])
+    process.wait()
+    return process.pid
+
+
+def write_lock(path, age=0, **info):
+    """Write a lock file last touched age seconds ago."""
+    with open(path, "w") as file:
+        json.dump({"time": time.time() - age, **info}, file)
+    os.utime(path, (time.time() - age, time.time() - age))
+
+
+def read_lock(path):
+    """Return the owner info stored in a lock file."""
+    with open(path) as file:
+        return json.load(file)
+
+
+def test_instance_name_is_persistent(tmp_path):
+    """Each install keeps its own random id, whatever its path or host."""
+    first = instance_name(str(tmp_path / "a" / "cache"))
+
+    assert instance_name(str(tmp_path / "a" / "cache")) == first
+    assert instance_name(str(tmp_path / "b" / "cache")) != first
+
+
+def test_dead_owner_of_this_install_is_broken(folder):
+    """A lock left by an exited process of this install is broken."""
+    lock = SharedCacheLock(folder, "a")
+    write_lock(lock.path, host=socket.gethostname(), instance="a", pid=dead_pid())
+
+    assert lock.acquire()
+    lock.release()
+
+
+def test_fresh_lock_of_another_install_is_kept(folder):
+    """Process ids from another install are not checked, only the age.
+
+    Containers share the hostname of their host, but not its process ids.
+    """
+    lock = SharedCacheLock(folder, "a")
+    for host in (socket.gethostname(), "other"):
+        write_lock(lock.path, host=host, instance="b", pid=dead_pid())
+        assert not lock.acquire()
+    assert read_lock(lock.path)["instance"] == "b"
+
+
+def test_old_lock_of_another_host_is_broken(folder):
+    """A lock not touched for LOCK_STALE_SECONDS is broken."""
+    lock = SharedCacheLock(folder, "a")
+    write_lock(
+        lock.path, age=LOCK_STALE_SECONDS + 1, host="other", instance="b", pid=1
+    )
+
+    assert lock.acquire()
+    assert read_lock(lock.path)["token"] == lock.token
+    lock.release()
+    assert not os.path.exists(lock.path)
+
+
+def test_lock_taken_while_breaking_is_put_back(folder, monkeypatch):
+    """A lock taken by another instance mid-break is restored, not deleted."""
+    lock = SharedCacheLock(folder, "a")
+    write_lock(lock.path, age=LOCK_STALE_SECONDS + 1, host="other", token="old")
+    is_stale = lock._is_stale
+
+    def other_breaks_first(info, age):
+        write_lock(lock.path, host="other", token="new")
+        return is_stale(info, age)
+
+    monkeypatch.setattr(lock, "_is_stale", other_breaks_first)
+    assert not lock.acquire()
+    assert read_lock(lock.path)["token"] == "new"
+    assert os.listdir(folder) == ["refresh.lock"]
+
+
+def test_lock_taken_twice_while_breaking(folder, monkeypatch):
+    """If the lock is retaken before it can be put back the newest is kept."""
+    lock = SharedCacheLock(folder, "a")
+    write_lock(lock.path, age=LOCK_STALE_SECONDS + 1, host="other", token="old")
+    is_stale = lock._is_stale
+    rename = os.rename
+
+    def other_breaks_first(info, age):
+        write_lock(lock.path, host="other", token="second")
+        return is_stale(info, age)
+
+    def third_takes_lock(src, dst):
+        rename(src, dst)
+        if src == lock.path:
+            write_lock(lock.path, host="other", token="third")
+
+    monkeypatch.setattr(lock, "_is_stale", other_breaks_first)
+    monkeypatch.setattr(os, "rename", third_takes_lock)
+    assert not lock.acquire()
+    assert read_lock(lock.path)["token"] == "third"
+    assert os.listdir(folder) == ["refresh.lock"]